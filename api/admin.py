@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 
-from .models import Category, Comment, Genre, Review, Title
+from .models import Category, Comment, Genre, OutgoingEmail, Review, Title
 
 User = get_user_model()
 
@@ -60,9 +60,17 @@ class CategoryAdmin(admin.ModelAdmin):
     list_filter = ('name',)
 
 
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'subject', 'created', 'attempts',
+                    'next_attempt_at', 'sent_at')
+    search_fields = ('recipient', 'subject')
+    list_filter = ('sent_at', 'created')
+
+
 admin.site.register(User, YamDBUserAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Title, TitleAdmin)
 admin.site.register(Genre, GenreAdmin)
 admin.site.register(Category, CategoryAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
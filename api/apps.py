@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        # подключение сигналов, поддерживающих поисковые индексы и кэш,
+        # и настроек соединений с SQLite
+        from . import autocomplete, cache, search, sqlite_profile  # noqa: F401
@@ -0,0 +1,109 @@
+"""
+ASGI обработчик с отдельным пулом потоков для чтения каталога.
+
+Django 3.0 не поддерживает асинхронные view, а стандартный ASGIHandler
+выполняет каждый запрос через sync_to_async; в актуальных версиях
+asgiref это один общий поток (thread_sensitive), то есть сервер
+обрабатывает запросы по одному.
+
+CatalogASGIHandler выполняет GET и HEAD запросы к чтению каталога
+(CATALOG_READ_ROUTES: произведения, жанры, категории, отзывы и
+комментарии) в ограниченном пуле из ASYNC_READ_WORKERS потоков, а
+чтение тела запроса и отправку ответа - в цикле событий. Медленный
+клиент занимает только сокет в цикле событий, а поток пула освобождается
+сразу после формирования ответа. Остальные запросы обрабатываются как
+раньше.
+
+Каждый поток пула держит своё соединение с базой; закрываются они по
+тем же правилам CONN_MAX_AGE, что и в обычном обработчике.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+from django.urls.base import set_script_prefix
+
+# маршруты чтения каталога, которые обрабатываются в пуле чтения
+CATALOG_READ_ROUTES = {
+    'titles-list',
+    'titles-detail',
+    'titles-top',
+    'genres-list',
+    'categories-list',
+    'reviews-list',
+    'reviews-detail',
+    'comments-list',
+    'comments-detail',
+}
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def is_catalog_read(scope):
+    if scope['type'] != 'http' or scope['method'] not in READ_METHODS:
+        return False
+    path, root_path = scope['path'], scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return False
+    return match.url_name in CATALOG_READ_ROUTES
+
+
+class CatalogASGIHandler(ASGIHandler):
+    """
+    ASGIHandler, который выполняет чтение каталога в пуле read_pool.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.read_pool = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_WORKERS,
+            thread_name_prefix='catalog-read',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if not is_catalog_read(scope):
+            return await super().__call__(scope, receive, send)
+
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        set_script_prefix(self.get_script_prefix(scope))
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            await self.send_response(error_response, send)
+            return
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self.read_pool, self.get_read_response, scope, request)
+        response._handler_class = self.__class__
+        await self.send_response(response, send)
+
+    def get_read_response(self, scope, request):
+        """
+        Формирует ответ в потоке пула. Сигнал request_started и
+        закрытие устаревших соединений выполняются в этом же потоке,
+        потому что соединения с базой у каждого потока свои.
+        """
+        signals.request_started.send(sender=self.__class__, scope=scope)
+        try:
+            # ответ DRF рендерится внутри get_response, поэтому дальше
+            # отправка ответа к базе не обращается
+            return self.get_response(request)
+        finally:
+            close_old_connections()
+
+
+def get_asgi_application():
+    import django
+    django.setup(set_prefix=False)
+    return CatalogASGIHandler()
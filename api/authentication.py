@@ -0,0 +1,160 @@
+"""
+JWT аутентификация без запроса к базе на каждый запрос.
+
+В access токен при выдаче кладутся username, роль, флаги пользователя и
+версия пользователя (см. cache.bump_versions для 'users:<id>'). Подпись
+токена гарантирует, что эти значения выдал сервер, поэтому пользователь
+строится прямо из токена: это экземпляр YamDBUser, у которого загружены
+только поля из токена, остальные догружаются из базы при обращении.
+
+Если пользователь изменился после выдачи токена (сигнал сменил его
+версию), либо в токене нет нужных полей (выдан старым кодом), то
+пользователь, как и раньше, загружается из базы. Версии хранятся в
+кэше ответов Django (RESPONSE_CACHE_ALIAS), и поля токена используются,
+только если этот кэш общий для всех процессов сервера (см.
+cache.versions_shared): иначе процесс, выдавший токен, не увидел бы
+изменения пользователя в другом процессе. С кэшем процесса
+(LocMemCache), при промахе или недоступности кэша пользователь
+загружается из базы.
+
+Уже проверенные токены хранятся в небольшом LRU в памяти процесса,
+чтобы не разбирать и не проверять подпись на каждый запрос.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import get_versions, versions_shared
+
+User = get_user_model()
+
+# поля пользователя, которые кладутся в токен
+USER_CLAIMS = ('username', 'role', 'is_active', 'is_superuser')
+VERSION_CLAIM = 'user_version'
+
+
+def user_version_name(user_id):
+    return f'users:{user_id}'
+
+
+def get_user_version(user_id):
+    """
+    Версия пользователя или None, если общего кэша версий нет
+    или он недоступен.
+    """
+    if not versions_shared():
+        return None
+    try:
+        return get_versions([user_version_name(user_id)])[0]
+    except Exception:
+        return None
+
+
+def token_for_user(user):
+    """
+    access токен для пользователя с полями для ClaimsJWTAuthentication
+    """
+    token = RefreshToken.for_user(user).access_token
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[VERSION_CLAIM] = get_user_version(user.pk)
+    return str(token)
+
+
+class ValidatedTokenCache:
+    """
+    LRU проверенных токенов: сырой токен -> проверенный токен.
+    Запись действует до истечения срока токена (claim exp).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+
+    def get(self, raw_token):
+        with self._lock:
+            item = self._tokens.get(raw_token)
+            if item is None:
+                return None
+            token, expires = item
+            if expires <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def set(self, raw_token, token):
+        with self._lock:
+            self._tokens[raw_token] = (token, token['exp'])
+            self._tokens.move_to_end(raw_token)
+            while len(self._tokens) > self.size:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+validated_tokens = ValidatedTokenCache(
+    settings.JWT_VALIDATED_TOKENS_CACHE_SIZE)
+
+
+def user_from_claims(validated_token):
+    """
+    YamDBUser из полей токена. Остальные поля отложены (deferred), а
+    save() такого объекта записывает только загруженные поля.
+    """
+    claims = {
+        User._meta.get_field(api_settings.USER_ID_FIELD).attname:
+            validated_token[api_settings.USER_ID_CLAIM],
+    }
+    claims.update(
+        (claim, validated_token[claim]) for claim in USER_CLAIMS)
+    # from_db ожидает значения в порядке полей модели
+    field_names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in claims
+    ]
+    return User.from_db(
+        DEFAULT_DB_ALIAS, field_names,
+        [claims[name] for name in field_names],
+    )
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который строит пользователя из полей токена
+    и обращается к базе, только если пользователь изменился.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = validated_tokens.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            validated_tokens.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        claims = (api_settings.USER_ID_CLAIM, VERSION_CLAIM) + USER_CLAIMS
+        if any(claim not in validated_token for claim in claims):
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        version = get_user_version(user_id)
+        if version is None or validated_token[VERSION_CLAIM] != version:
+            return super().get_user(validated_token)
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        return user_from_claims(validated_token)
@@ -0,0 +1,329 @@
+"""
+Префиксный индекс названий Title, Genre и Category для автодополнения.
+
+Индекс хранится в памяти процесса: для каждого вида (titles, genres,
+categories) отсортированный массив записей (ключ, ident, payload), где
+ключ - casefold названия и каждого его суффикса, начинающегося со
+слова. Поиск по префиксу - двоичный поиск в массивах нужных видов без
+обращения к базе, поэтому фильтр type= не просматривает чужие записи.
+
+Поиск держит блокировку только на время двоичного поиска. Несколько
+ключей вставляются и удаляются на месте, а пачка (titles_bulk_created,
+перестроение) готовится на копии массива и подменяет его целиком,
+поэтому поиск её не ждёт. Индекс строится в фоне при запуске
+сервера (build_in_background, см. api_yamdb/wsgi.py) или при первом
+поиске и обновляется сигналами save/delete после коммита.
+Каждый процесс сервера держит свою копию, поэтому изменения из других
+процессов подхватываются перестроением в фоне по таймауту
+settings.AUTOCOMPLETE_INDEX_TIMEOUT, а пока оно идёт, поиск отвечает
+по старому индексу.
+"""
+import gc
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, models, transaction
+
+from .models import Category, Genre, Title, titles_bulk_created
+
+logger = logging.getLogger(__name__)
+
+WORD_START_RE = re.compile(r'\b\w', re.UNICODE)
+
+# до стольких изменённых ключей массив меняется на месте, больше -
+# сливается с копией массива
+INSORT_LIMIT = 64
+
+KINDS = {
+    'titles': Title,
+    'genres': Genre,
+    'categories': Category,
+}
+
+
+def make_payload(kind, instance):
+    if kind == 'titles':
+        return {'type': kind, 'id': instance.id, 'name': instance.name}
+    return {'type': kind, 'slug': instance.slug, 'name': instance.name}
+
+
+def index_keys(name):
+    """
+    Ключи индекса для названия: полное название и все его
+    окончания, начинающиеся с нового слова. Так 'Поворот туда'
+    находится и по 'пов', и по 'туд'.
+    """
+    name = (name or '').casefold()
+    return {name[match.start():] for match in WORD_START_RE.finditer(name)}
+
+
+def search_items(items, prefix, limit):
+    """
+    Первые limit записей разных объектов с ключом на prefix.
+    """
+    found = []
+    seen = set()
+    position = bisect_left(items, (prefix,))
+    while len(found) < limit and position < len(items):
+        item = items[position]
+        if not item[0].startswith(prefix):
+            break
+        position += 1
+        if item[1] not in seen:
+            seen.add(item[1])
+            found.append(item)
+    return found
+
+
+def remove_items(items, pairs):
+    for pair in pairs:
+        position = bisect_left(items, pair)
+        if position < len(items) and items[position][:2] == pair:
+            del items[position]
+
+
+def merge_items(items, added):
+    """
+    Сливает отсортированный items с новыми записями: место каждой
+    записи ищется двоичным поиском, а куски items между ними
+    копируются целиком.
+    """
+    added.sort()
+    merged = []
+    start = 0
+    for item in added:
+        position = bisect_left(items, item, start)
+        merged.extend(items[start:position])
+        merged.append(item)
+        start = position
+    merged.extend(items[start:])
+    return merged
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        # вид -> отсортированный список (ключ, ident, payload); пара
+        # (ключ, ident) уникальна, поэтому payload не сравнивается
+        self._items = {kind: [] for kind in KINDS}
+        # ident -> ключи объекта, чтобы удалить их при изменении
+        self._objects = {}
+        self._loaded_at = None
+        self._init_locks()
+        os.register_at_fork(after_in_child=self._init_locks)
+
+    def _init_locks(self):
+        # в дочернем процессе блокировки могли остаться захваченными
+        # потоками родителя, которых там нет
+        # _lock защищает массивы от поиска во время изменения на месте,
+        # _write_lock выстраивает изменения и перестроение в очередь
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._builder = None
+        # изменения, пришедшие во время перестроения: повторяются на
+        # новом индексе, иначе они потерялись бы при его подмене
+        self._journal = None
+
+    def _is_stale(self):
+        return (
+            self._loaded_at is None or
+            time.monotonic() - self._loaded_at >
+            settings.AUTOCOMPLETE_INDEX_TIMEOUT
+        )
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            # отвечать пока нечем: ждём построения (или строим сами)
+            with self._build_lock:
+                if self._loaded_at is None:
+                    self._build()
+        elif self._is_stale():
+            self.build_in_background()
+
+    def build_in_background(self):
+        """
+        Перестраивает индекс в фоновом потоке, если он ещё не строится.
+        """
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            self._builder = threading.Thread(
+                target=self._background_build,
+                name='autocomplete-index', daemon=True)
+            self._builder.start()
+        except Exception:
+            self._build_lock.release()
+            raise
+
+    def _background_build(self):
+        try:
+            self._build()
+        except Exception:
+            logger.exception('Не удалось построить индекс автодополнения')
+        finally:
+            self._build_lock.release()
+            connection.close()
+
+    def join(self, timeout=None):
+        """
+        Ждёт окончания фонового перестроения.
+        """
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+
+    def _build(self):
+        """
+        Загружает все названия и сортирует ключи каждого вида один раз
+        (вставка каждого ключа по месту стоила бы O(n^2)).
+        """
+        with self._write_lock:
+            self._journal = []
+        # миллионы мелких объектов запускают сборщик мусора снова и
+        # снова, хотя циклов среди них нет
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            items = {}
+            objects = {}
+            for kind, model in KINDS.items():
+                kind_items = items[kind] = []
+                for instance in model.objects.all().iterator():
+                    ident = (kind, instance.pk)
+                    keys = index_keys(instance.name)
+                    payload = make_payload(kind, instance)
+                    objects[ident] = keys
+                    kind_items.extend((key, ident, payload) for key in keys)
+                kind_items.sort()
+            with self._write_lock:
+                with self._lock:
+                    self._items = items
+                    self._objects = objects
+                    self._loaded_at = time.monotonic()
+                for change in self._journal:
+                    self._apply(*change)
+                self._journal = None
+        finally:
+            with self._write_lock:
+                self._journal = None
+            if gc_enabled:
+                gc.enable()
+
+    def _apply(self, kind, instances=(), removed=()):
+        """
+        Применяет изменения к массиву вида. Вызывается под
+        self._write_lock.
+        """
+        idents = [(kind, pk) for pk in removed]
+        idents.extend((kind, instance.pk) for instance in instances)
+        old = [
+            (key, ident)
+            for ident in idents
+            for key in self._objects.pop(ident, ())
+        ]
+        added = []
+        for instance in instances:
+            ident = (kind, instance.pk)
+            keys = index_keys(instance.name)
+            payload = make_payload(kind, instance)
+            self._objects[ident] = keys
+            added.extend((key, ident, payload) for key in keys)
+
+        if len(old) + len(added) <= INSORT_LIMIT:
+            # сдвиг массива на месте - это memmove, дешевле копии
+            with self._lock:
+                items = self._items[kind]
+                remove_items(items, old)
+                for item in added:
+                    insort(items, item)
+            return
+        # другие изменения ждут self._write_lock, поэтому массив
+        # не меняется, пока готовится копия
+        items = list(self._items[kind])
+        remove_items(items, old)
+        items = merge_items(items, added)
+        with self._lock:
+            self._items[kind] = items
+
+    def _change(self, kind, instances=(), removed=()):
+        with self._write_lock:
+            if self._journal is not None:
+                self._journal.append((kind, instances, removed))
+            if self._loaded_at is not None:
+                self._apply(kind, instances, removed)
+
+    def update(self, kind, instance):
+        self._change(kind, instances=(instance,))
+
+    def update_many(self, kind, instances):
+        self._change(kind, instances=tuple(instances))
+
+    def remove(self, kind, instance):
+        self._change(kind, removed=(instance.pk,))
+
+    def clear(self):
+        with self._write_lock, self._lock:
+            self._items = {kind: [] for kind in KINDS}
+            self._objects = {}
+            self._loaded_at = None
+
+    def search(self, prefix, kinds=None, limit=10):
+        self._ensure_loaded()
+        prefix = prefix.casefold()
+        if not prefix:
+            return []
+        with self._lock:
+            found = [
+                search_items(self._items[kind], prefix, limit)
+                for kind in (kinds or KINDS)
+            ]
+        return [
+            payload
+            for _, _, payload in islice(heapq.merge(*found), limit)
+        ]
+
+
+prefix_index = PrefixIndex()
+
+
+def build_on_startup():
+    """
+    Запускает построение индекса в фоне при старте сервера, чтобы
+    первые запросы автодополнения не ждали загрузки из базы.
+    """
+    if settings.AUTOCOMPLETE_BUILD_ON_STARTUP:
+        prefix_index.build_in_background()
+
+
+MODEL_KINDS = {model: kind for kind, model in KINDS.items()}
+
+
+# индекс меняется после коммита, чтобы откаченная запись не оставила
+# в нём несуществующих названий
+def object_saved(sender, instance, **kwargs):
+    kind = MODEL_KINDS[sender]
+    transaction.on_commit(lambda: prefix_index.update(kind, instance))
+
+
+def object_deleted(sender, instance, **kwargs):
+    kind = MODEL_KINDS[sender]
+    transaction.on_commit(lambda: prefix_index.remove(kind, instance))
+
+
+def titles_created(sender, instances, **kwargs):
+    transaction.on_commit(
+        lambda: prefix_index.update_many('titles', instances))
+
+
+titles_bulk_created.connect(titles_created, sender=Title)
+for model in KINDS.values():
+    models.signals.post_save.connect(object_saved, sender=model)
+    models.signals.post_delete.connect(object_deleted, sender=model)
@@ -0,0 +1,267 @@
+"""
+Нагрузочные замеры в процессе, без HTTP сервера.
+
+Приложения WSGI и ASGI вызываются напрямую, а медленный клиент
+моделируется паузой client_delay при получении ответа. WSGI сервер с
+пулом потоков (gunicorn gthread, mod_wsgi) держит поток, пока клиент
+не получит ответ, поэтому для WSGI пауза выполняется в потоке
+обработчика; ASGI сервер ждёт клиента в цикле событий.
+
+Каждый из clients клиентов выполняет подряд requests запросов;
+задержка запроса считается с момента, когда клиент готов его отправить,
+поэтому включает и ожидание свободного потока.
+
+run_mixed замеряет одновременные чтения и записи в базу через ORM: в
+каждом потоке после операции соединение закрывается или сохраняется
+по CONN_MAX_AGE, как в конце запроса к серверу.
+"""
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.db import OperationalError, connections
+
+
+class BenchmarkResult:
+
+    def __init__(self, name, latencies, elapsed, statuses, peak_threads):
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+        self.statuses = statuses
+        self.peak_threads = peak_threads
+
+    def percentile(self, value):
+        index = min(len(self.latencies) - 1,
+                    int(len(self.latencies) * value / 100))
+        return self.latencies[index]
+
+    @property
+    def throughput(self):
+        return len(self.latencies) / self.elapsed
+
+    def __str__(self):
+        statuses = ', '.join(
+            f'{status}: {count}'
+            for status, count in sorted(self.statuses.items()))
+        return (
+            f'{self.name}: {self.throughput:.1f} запросов/с, '
+            f'p50 {self.percentile(50) * 1000:.1f} мс, '
+            f'p95 {self.percentile(95) * 1000:.1f} мс, '
+            f'потоков: {self.peak_threads}, ответы: {statuses}'
+        )
+
+
+class ThreadCounter:
+    """
+    Максимальное число потоков процесса за время замера.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        # сам счётчик не считаем
+        self.peak -= 1
+
+
+def count_status(statuses, status):
+    statuses[status] = statuses.get(status, 0) + 1
+
+
+def wsgi_environ(url, method='GET'):
+    parts = urlsplit(url)
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(url, method='GET'):
+    parts = urlsplit(url)
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+
+
+def run_wsgi(name, application, urls, clients, requests, client_delay,
+             threads):
+    """
+    Замер WSGI приложения на пуле из threads потоков.
+    urls - функция (номер клиента, номер запроса) -> адрес.
+    """
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def client(number, started):
+        ready = started
+        for index in range(requests):
+            status = []
+            result = application(
+                wsgi_environ(urls(number, index)),
+                lambda value, headers, exc_info=None: status.append(value),
+            )
+            try:
+                for _ in result:
+                    pass
+                # клиент медленно получает ответ, поток занят
+                time.sleep(client_delay)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            finished = time.perf_counter()
+            with lock:
+                latencies.append(finished - ready)
+                count_status(statuses, int(status[0].split()[0]))
+            ready = finished
+
+    with ThreadCounter() as counter:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            futures = [
+                pool.submit(client, number, start)
+                for number in range(clients)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+    return BenchmarkResult(
+        name, latencies, elapsed, statuses, counter.peak)
+
+
+def run_asgi(name, application, urls, clients, requests, client_delay):
+    """
+    Замер ASGI приложения: все клиенты работают в одном цикле событий.
+    """
+    latencies, statuses = [], {}
+
+    async def request(url):
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # запрос прочитан, клиент ждёт ответа
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                count_status(statuses, message['status'])
+            elif not message.get('more_body'):
+                # клиент медленно получает ответ, ждёт только сокет
+                await asyncio.sleep(client_delay)
+
+        await application(asgi_scope(url), receive, send)
+
+    async def client(number, started):
+        ready = started
+        for index in range(requests):
+            await request(urls(number, index))
+            finished = time.perf_counter()
+            latencies.append(finished - ready)
+            ready = finished
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client(number, start) for number in range(clients)))
+        return time.perf_counter() - start
+
+    with ThreadCounter() as counter:
+        elapsed = asyncio.run(main())
+    return BenchmarkResult(
+        name, latencies, elapsed, statuses, counter.peak)
+
+
+def run_mixed(name, alias, read, write, readers, writers, duration):
+    """
+    readers потоков выполняют read(alias), а writers потоков - write(alias)
+    в течение duration секунд. Возвращает результаты для чтений и записей;
+    ошибки базы (database is locked) считаются как статус 'locked'.
+    """
+    results = {
+        'read': ([], {}),
+        'write': ([], {}),
+    }
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(kind, operation):
+        latencies, statuses = results[kind]
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    operation(alias)
+                    status = 'ok'
+                except OperationalError:
+                    status = 'locked'
+                finished = time.perf_counter()
+                with lock:
+                    latencies.append(finished - start)
+                    count_status(statuses, status)
+                connections[alias].close_if_unusable_or_obsolete()
+        finally:
+            connections[alias].close()
+
+    threads = [
+        threading.Thread(target=worker, args=('read', read))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=worker, args=('write', write))
+        for _ in range(writers)
+    ]
+    with ThreadCounter() as counter:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    return [
+        BenchmarkResult(f'{name}, {kind}', latencies, elapsed, statuses,
+                        counter.peak)
+        for kind, (latencies, statuses) in results.items()
+        if latencies
+    ]
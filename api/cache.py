@@ -0,0 +1,302 @@
+"""
+Кэш ответов на анонимные GET запросы к произведениям, жанрам и
+категориям на базе Django cache framework и условные GET запросы
+(ETag, Last-Modified).
+
+Ключ ответа строится из адреса, отсортированных параметров запроса и
+версий данных, от которых зависит ответ. Версии хранятся в том же кэше
+и меняются сигналами при записи моделей, поэтому устаревшие ответы
+просто перестают находиться и вытесняются по таймауту.
+
+Версии:
+  <namespace>             - все ответы раздела (titles, genres, categories)
+  <namespace>:list        - списки раздела
+  <namespace>:object:<pk> - ответ для одного объекта
+  reviews:title:<pk>      - отзывы произведения
+  comments:review:<pk>    - комментарии к отзыву
+  users                   - пользователи (username авторов)
+  users:<pk>              - пользователь (версия в его JWT токенах)
+
+Версии меняются только в кэше процесса, который выполнил запись. Если
+кэш у каждого процесса свой (LocMemCache), другие процессы изменения
+не видят, поэтому кэш ответов, условные GET запросы и проверка токенов
+по версиям (authentication.py) работают только с общим кэшем (memcached, redis,
+база, файлы) или при CACHE_SINGLE_PROCESS (runserver, тесты).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import models, transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import (Category, Comment, Genre, Review, Title, YamDBUser,
+                     titles_bulk_created)
+
+KEY_PREFIX = 'response-cache'
+HITS_KEY = f'{KEY_PREFIX}:hits'
+MISSES_KEY = f'{KEY_PREFIX}:misses'
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def versions_shared():
+    """
+    Видят ли все процессы сервера версии, изменённые в одном из них.
+    """
+    return (
+        settings.CACHE_SINGLE_PROCESS or
+        not isinstance(get_cache(), LocMemCache)
+    )
+
+
+def version_key(name):
+    return f'{KEY_PREFIX}:version:{name}'
+
+
+def get_versions(names):
+    cache = get_cache()
+    keys = [version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*names):
+    # версии меняются после коммита, иначе параллельный запрос успеет
+    # закэшировать ещё не закоммиченное состояние под новой версией
+    def bump():
+        get_cache().set_many(
+            {version_key(name): time.time_ns() for name in names},
+            timeout=None
+        )
+    transaction.on_commit(bump)
+
+
+def count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats():
+    stats = get_cache().get_many((HITS_KEY, MISSES_KEY))
+    return {
+        'hits': stats.get(HITS_KEY, 0),
+        'misses': stats.get(MISSES_KEY, 0),
+    }
+
+
+def response_key(request, versions):
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+    )
+    raw = repr((
+        request.build_absolute_uri(request.path),
+        params,
+        request.accepted_renderer.format,
+        versions,
+    ))
+    return f'{KEY_PREFIX}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+class DataVersionMixin:
+    """
+    Версии данных, от которых зависит ответ текущего действия viewset'а.
+    По умолчанию: раздел cache_namespace плюс список или объект.
+    Версии читаются из кэша один раз за запрос.
+    """
+    cache_namespace = None
+
+    def get_version_names(self):
+        namespace = self.cache_namespace
+        if self.action == 'retrieve':
+            lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            return (namespace, f'{namespace}:object:{lookup}')
+        return (namespace, f'{namespace}:list')
+
+    def get_data_versions(self):
+        if getattr(self, '_data_versions', None) is None:
+            self._data_versions = get_versions(self.get_version_names())
+        return self._data_versions
+
+
+class CachedListMixin(DataVersionMixin):
+    """
+    Кэширует ответы list для анонимных пользователей.
+    В ответ добавляется заголовок X-Cache: HIT или MISS.
+
+    Без общего кэша версий (см. versions_shared) ответы не кэшируются:
+    другие процессы не узнали бы о записи и отдавали бы устаревшие
+    ответы до RESPONSE_CACHE_TIMEOUT.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not request.user.is_anonymous or not versions_shared():
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_key(request, self.get_data_versions())
+        cached = cache.get(key)
+        if cached is not None:
+            count(HITS_KEY)
+            data, status_code = cached
+            response = Response(data, status=status_code)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        count(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(
+                key,
+                (response.data, response.status_code),
+                settings.RESPONSE_CACHE_TIMEOUT
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListRetrieveMixin(CachedListMixin):
+    """
+    Кэширует ответы list и retrieve для анонимных пользователей.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin(DataVersionMixin):
+    """
+    Условные GET запросы для list и retrieve.
+
+    ETag и Last-Modified вычисляются только по версиям данных, поэтому
+    при совпадении If-None-Match (или If-Modified-Since) ответ
+    304 Not Modified отдаётся без запросов к базе и сериализации.
+    Версия - это время последнего изменения в наносекундах, из неё же
+    берётся Last-Modified.
+
+    Без общего кэша версий (см. versions_shared) заголовки не
+    выставляются и ответ всегда формируется заново.
+    If-None-Match: * проверяется по ответу, чтобы для
+    несуществующего объекта вернуть 404, а не 304.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not versions_shared():
+            return handler(request, *args, **kwargs)
+        versions = self.get_data_versions()
+        etag = '"{}"'.format(
+            response_key(request, versions).rsplit(':', 1)[-1])
+        last_modified = max(versions) // 10 ** 9
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        response = None
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            not_modified = etag in etags
+            if not not_modified and '*' in etags:
+                response = handler(request, *args, **kwargs)
+                not_modified = response.status_code == status.HTTP_200_OK
+        else:
+            not_modified = (
+                if_modified_since is not None and
+                last_modified <= if_modified_since
+            )
+
+        if not_modified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            if response is None:
+                response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+def title_changed(sender, instance, **kwargs):
+    bump_versions('titles:list', f'titles:object:{instance.pk}')
+
+
+def titles_created(sender, instances, **kwargs):
+    bump_versions('titles:list')
+
+
+def review_changed(sender, instance, **kwargs):
+    # рейтинг произведения хранится в Title и меняется вместе с отзывом
+    bump_versions(
+        'titles:list',
+        f'titles:object:{instance.title_id}',
+        f'reviews:title:{instance.title_id}',
+    )
+
+
+def comment_changed(sender, instance, **kwargs):
+    bump_versions(f'comments:review:{instance.review_id}')
+
+
+def user_changed(sender, instance, **kwargs):
+    # в отзывах и комментариях выводится username автора, а версия
+    # пользователя сверяется с токеном (см. authentication.py)
+    bump_versions('users', f'users:{instance.pk}')
+
+
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        title_changed(sender, instance)
+    else:
+        # изменение со стороны жанра затрагивает произвольные произведения
+        bump_versions('titles')
+
+
+def genre_changed(sender, instance, **kwargs):
+    bump_versions('genres', 'titles')
+
+
+def category_changed(sender, instance, **kwargs):
+    bump_versions('categories', 'titles')
+
+
+for signal in (models.signals.post_save, models.signals.post_delete):
+    signal.connect(title_changed, sender=Title)
+    signal.connect(review_changed, sender=Review)
+    signal.connect(comment_changed, sender=Comment)
+    signal.connect(user_changed, sender=YamDBUser)
+    signal.connect(genre_changed, sender=Genre)
+    signal.connect(category_changed, sender=Category)
+titles_bulk_created.connect(titles_created, sender=Title)
+models.signals.m2m_changed.connect(
+    title_genres_changed, sender=Title.genre.through)
@@ -0,0 +1,133 @@
+"""
+Потоковая выгрузка таблиц в csv или NDJSON (опционально gzip).
+
+Строки читаются из базы через .iterator() пачками по chunk_size и сразу
+превращаются в байты, поэтому память не зависит от размера таблицы.
+Колонки и формат значений совпадают с data/*.csv, так что выгрузку в
+csv можно загрузить обратно командой import_data.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .importer import TABLE_CONFIG
+from .models import Title, YamDBUser
+
+# имя выгрузки (как у csv файла в data/) и модель
+EXPORT_TABLES = {filename: model for model, filename in TABLE_CONFIG}
+
+# поля, которые не выгружаются
+EXCLUDED_FIELDS = {
+    YamDBUser: ('password',),
+}
+
+# выгружаемые поля моделей, у которых в таблице есть служебные колонки:
+# у произведений это колонки data/titles.csv, описание и рейтинг, а
+# агрегаты оценок (score_sum, гистограмма, weighted_rating) наружу не
+# отдаются, как и в API (TITLE_FIELDS); import_data пересчитывает их
+EXPORT_FIELDS = {
+    Title: ('id', 'name', 'year', 'category', 'description', 'rating'),
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class EchoBuffer:
+    """
+    Файлоподобный объект для csv.writer: возвращает записанную строку
+    вместо того, чтобы копить её в памяти.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_fields(model):
+    if model in EXPORT_FIELDS:
+        return [model._meta.get_field(name) for name in EXPORT_FIELDS[model]]
+    excluded = EXCLUDED_FIELDS.get(model, ())
+    return [
+        field for field in model._meta.concrete_fields
+        if field.name not in excluded
+    ]
+
+
+def export_columns(model):
+    # названия колонок как в data/*.csv: столбцы таблицы (title_id, author)
+    return [field.column for field in export_fields(model)]
+
+
+def export_rows(model, chunk_size):
+    attnames = [field.attname for field in export_fields(model)]
+    return model.objects.order_by('pk').values_list(*attnames).iterator(
+        chunk_size=chunk_size)
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(columns, row)),
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+        ) + '\n'
+
+
+def encode(lines, compress=False):
+    """
+    Кодирует строки в utf-8 и при compress сжимает их в формат gzip
+    потоком, без буферизации всего файла.
+    """
+    if not compress:
+        for line in lines:
+            yield line.encode()
+        return
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(table, output_format, compress=False):
+    filename = f'{table}.{output_format}'
+    if compress:
+        filename += '.gz'
+    return filename
+
+
+def export_stream(table, output_format, compress, chunk_size):
+    """
+    Генератор байтов выгрузки таблицы table (ключ EXPORT_TABLES)
+    в формате output_format (csv или ndjson).
+    """
+    model = EXPORT_TABLES[table]
+    columns = export_columns(model)
+    rows = export_rows(model, chunk_size)
+    if output_format == 'csv':
+        lines = csv_lines(columns, rows)
+    else:
+        lines = ndjson_lines(columns, rows)
+    return encode(lines, compress)
@@ -1,16 +1,84 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
 from .models import Title
+from .reference import categories_cache, genres_cache
+from .search import search_titles
 
 
 class TitleFilter(filters.FilterSet):
     """
     Фильтрация Title по genre__slug, category__slug, name
+
+    slug жанра и категории переводится в id через кэш справочников,
+    поэтому фильтр не делает JOIN с их таблицами.
     """
-    genre = filters.CharFilter(field_name='genre__slug')
-    category = filters.CharFilter(field_name='category__slug')
+    genre = filters.CharFilter(method='filter_genre')
+    category = filters.CharFilter(method='filter_category')
     name = filters.CharFilter(field_name='name', lookup_expr='contains')
 
+    def filter_genre(self, queryset, name, value):
+        genre = genres_cache.get_by_slug(value)
+        if genre is None:
+            return queryset.none()
+        return queryset.filter(genre=genre.id)
+
+    def filter_category(self, queryset, name, value):
+        category = categories_cache.get_by_slug(value)
+        if category is None:
+            return queryset.none()
+        return queryset.filter(category_id=category.id)
+
     class Meta:
         model = Title
         fields = ('year',)
+
+
+class TitleFullTextFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск Title по name и description: ?q=
+    Слова ищутся по префиксу, результаты отсортированы по релевантности.
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_titles(queryset, text)
+
+
+class TitleOrderingFilter(OrderingFilter):
+    """
+    Сортировка Title: ?ordering=rating, year, name, reviews_count
+    (с минусом - по убыванию, через запятую - несколько полей).
+
+    Все поля хранятся в Title и покрыты индексами вида (поле, id) и
+    (category или year, поле, id), поэтому к сортировке добавляется id
+    в направлении последнего поля: порядок однозначен, а база читает
+    его из индекса без сортировки всей таблицы.
+    """
+    ordering_fields = {
+        'rating': 'rating',
+        'year': 'year',
+        'name': 'name',
+        'reviews_count': 'score_count',
+    }
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return self.get_default_ordering(view)
+        ordering = []
+        for term in params.split(','):
+            term = term.strip()
+            field = self.ordering_fields.get(term.lstrip('-'))
+            if field is not None:
+                ordering.append(f'-{field}' if term.startswith('-') else field)
+        if not ordering:
+            return self.get_default_ordering(view)
+        ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def get_valid_fields(self, queryset, view, context={}):
+        return [(name, name) for name in self.ordering_fields]
@@ -0,0 +1,37 @@
+"""
+Код процессов пула параллельной загрузки (см. importer.py).
+
+Процессы запускаются через spawn, поэтому модуль не импортирует модели
+на верхнем уровне: сначала init() настраивает Django.
+"""
+import os
+import pickle
+import time
+
+
+def init():
+    import django
+    django.setup()
+
+
+def parse_to_spool(model_label, filename, chunk_size, spool_dir):
+    """
+    Читает и проверяет csv файл и складывает приведённые значения
+    пачками во временный pickle файл, чтобы не держать таблицу в
+    памяти и не передавать её через очередь.
+    Возвращает (путь до файла, число строк, время разбора).
+    """
+    from django.apps import apps
+
+    from .importer import chunked, convert_rows, read_rows
+
+    start = time.perf_counter()
+    model = apps.get_model(model_label)
+    spool_path = os.path.join(spool_dir, f'{model._meta.db_table}.pickle')
+    count = 0
+    with open(spool_path, 'wb') as spool:
+        for chunk in chunked(
+                convert_rows(model, read_rows(filename)), chunk_size):
+            pickle.dump(chunk, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            count += len(chunk)
+    return spool_path, count, time.perf_counter() - start
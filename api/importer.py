@@ -0,0 +1,344 @@
+"""
+Потоковая загрузка данных из csv файлов (data/*.csv) в базу через ORM.
+
+Строки читаются генератором и пишутся пачками через bulk_create, так
+что память не зависит от размера файлов, а загрузка работает на любой
+настроенной СУБД. Таблицы загружаются в порядке зависимостей внешних
+ключей.
+
+В параллельном режиме (load_tables_parallel) разбор и проверка csv
+выполняются в пуле процессов, а запись остаётся в одном процессе.
+
+В инкрементальном режиме (sync_table) для каждой загруженной строки
+хранится хэш её содержимого (ImportedRow), и повторная загрузка
+разбирает и записывает только новые и изменившиеся строки, а строки,
+пропавшие из csv, удаляет.
+"""
+import csv
+import hashlib
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from . import import_worker
+from .models import (Category, Comment, Genre, ImportedRow, Review, Title,
+                     YamDBUser, titles_bulk_created)
+
+# модель и csv файл с её данными в порядке зависимостей внешних ключей
+TABLE_CONFIG = (
+    (YamDBUser, 'users'),
+    (Category, 'category'),
+    (Genre, 'genre'),
+    (Title, 'titles'),
+    (Title.genre.through, 'genre_title'),
+    (Review, 'review'),
+    (Comment, 'comments'),
+)
+
+# настройки SQLite на время загрузки: без fsync и с журналом в памяти.
+# при сбое во время загрузки базу придётся загрузить заново
+SQLITE_FAST_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-200000',
+}
+
+
+def read_rows(filename):
+    """
+    Генератор строк csv файла в виде словарей.
+    Лишние значения в конце строки (висящая запятая) отбрасываются.
+    """
+    with open(filename, 'r', encoding='utf8', newline='') as read_csv:
+        for row in csv.DictReader(read_csv):
+            row.pop(None, None)
+            yield row
+
+
+def build_field_map(model, headers):
+    """
+    Соответствие колонок csv полям модели: колонка может называться
+    как поле, как его attname или как столбец в базе (author, title_id).
+    """
+    fields = {}
+    for field in model._meta.concrete_fields:
+        for name in (field.name, field.attname, field.column):
+            fields.setdefault(name, field)
+    unknown = [header for header in headers if header not in fields]
+    if unknown:
+        raise ValueError(
+            f'{model._meta.label}: неизвестные колонки {", ".join(unknown)}')
+    return {header: fields[header] for header in headers}
+
+
+def convert_value(field, value):
+    if value == '' and field.null:
+        return None
+    if isinstance(field, models.ForeignKey):
+        field = field.target_field
+    value = field.to_python(value)
+    if (isinstance(field, models.DateTimeField) and settings.USE_TZ and
+            timezone.is_naive(value)):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def convert_row(field_map, row):
+    return {
+        field_map[header].attname: convert_value(field_map[header], value)
+        for header, value in row.items()
+    }
+
+
+def convert_rows(model, rows):
+    """
+    Генератор проверенных и приведённых к типам полей значений строк
+    в виде словарей {attname: значение}.
+    """
+    field_map = None
+    for row in rows:
+        if field_map is None:
+            field_map = build_field_map(model, row.keys())
+        yield convert_row(field_map, row)
+
+
+def build_objects(model, rows):
+    for values in convert_rows(model, rows):
+        yield model(**values)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def fast_load():
+    """
+    Включает быстрые настройки SQLite на время загрузки и
+    восстанавливает прежние значения после неё.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        saved = {}
+        for pragma, value in SQLITE_FAST_LOAD_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma}')
+            current = cursor.fetchone()[0]
+            if pragma == 'journal_mode' and str(current).lower() == 'wal':
+                # режим WAL общий для всех соединений, его не трогаем
+                continue
+            saved[pragma] = current
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for pragma, value in saved.items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@contextmanager
+def keep_auto_dates(model):
+    """
+    Поля auto_now/auto_now_add (pub_date) при bulk_create получают
+    текущее время. На время загрузки отключаем это, чтобы сохранить
+    даты из csv. Поля модели общие для процесса, поэтому используется
+    только в команде загрузки.
+    """
+    changed = []
+    for field in model._meta.concrete_fields:
+        flags = {
+            flag: getattr(field, flag)
+            for flag in ('auto_now', 'auto_now_add')
+            if getattr(field, flag, False)
+        }
+        if flags:
+            changed.append((field, flags))
+            for flag in flags:
+                setattr(field, flag, False)
+    try:
+        yield
+    finally:
+        for field, flags in changed:
+            for flag, value in flags.items():
+                setattr(field, flag, value)
+
+
+def write_chunks(model, chunks, dry_run=False):
+    count = 0
+    with keep_auto_dates(model):
+        for chunk in chunks:
+            if not dry_run:
+                with transaction.atomic():
+                    model.objects.bulk_create(chunk, ignore_conflicts=True)
+            count += len(chunk)
+    return count
+
+
+def load_table(model, filename, chunk_size, dry_run=False):
+    """
+    Загружает один csv файл пачками по chunk_size строк.
+    Уже существующие строки пропускаются (как INSERT OR IGNORE).
+    Возвращает (число строк, время в секундах).
+    """
+    start = time.perf_counter()
+    objects = build_objects(model, read_rows(filename))
+    count = write_chunks(model, chunked(objects, chunk_size), dry_run)
+    return count, time.perf_counter() - start
+
+
+def read_spool(model, spool_path):
+    with open(spool_path, 'rb') as spool:
+        while True:
+            try:
+                chunk = pickle.load(spool)
+            except EOFError:
+                return
+            yield [model(**values) for values in chunk]
+
+
+def load_tables_parallel(tables, chunk_size, workers, dry_run=False):
+    """
+    Разбирает csv файлы параллельно в пуле из workers процессов, а
+    единственный писатель (текущий процесс) записывает их в порядке
+    зависимостей внешних ключей по мере готовности.
+
+    tables - список (модель, путь до csv). Генератор возвращает для
+    каждой таблицы (модель, число строк, время разбора, время записи).
+    """
+    # процессы пула запускаются через spawn, чтобы не наследовать
+    # открытые соединения с базой; базу они не используют
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='yamdb-import-') as spool_dir:
+        with ProcessPoolExecutor(workers, mp_context=context,
+                                 initializer=import_worker.init) as pool:
+            futures = [
+                (model, pool.submit(
+                    import_worker.parse_to_spool, model._meta.label,
+                    filename, chunk_size, spool_dir))
+                for model, filename in tables
+            ]
+            for model, future in futures:
+                spool_path, count, parse_time = future.result()
+                start = time.perf_counter()
+                write_chunks(model, read_spool(model, spool_path), dry_run)
+                os.remove(spool_path)
+                yield model, count, parse_time, time.perf_counter() - start
+
+
+def row_hash(row):
+    raw = '\x1f'.join(f'{header}={value}' for header, value in row.items())
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def sync_table(model, filename, chunk_size, dry_run=False):
+    """
+    Инкрементальная загрузка csv файла: строки сравниваются по хэшу с
+    прошлой загрузкой, и разбираются и записываются только новые и
+    изменившиеся. Строки, уже лежащие в базе без хэша (например, после
+    обычной загрузки), обновляются и получают хэш.
+
+    Возвращает (статистику {inserted, updated, unchanged}, список id
+    строк, пропавших из csv). Удаляются они отдельно (delete_rows),
+    в обратном порядке зависимостей таблиц.
+    """
+    label = model._meta.label
+    stats = dict.fromkeys(('inserted', 'updated', 'unchanged'), 0)
+    seen = set()
+    field_map = pk_header = update_fields = None
+    with keep_auto_dates(model):
+        for chunk in chunked(read_rows(filename), chunk_size):
+            if field_map is None:
+                field_map = build_field_map(model, chunk[0].keys())
+                pk_header = next(
+                    header for header, field in field_map.items()
+                    if field.primary_key
+                )
+                update_fields = [
+                    field.name for field in field_map.values()
+                    if not field.primary_key
+                ]
+
+            hashes = {
+                model._meta.pk.to_python(row[pk_header]): (row_hash(row), row)
+                for row in chunk
+            }
+            seen.update(hashes)
+            known = dict(ImportedRow.objects.filter(
+                table=label, object_id__in=hashes
+            ).values_list('object_id', 'row_hash'))
+            changed = [
+                pk for pk, (digest, row) in hashes.items()
+                if known.get(pk) != digest
+            ]
+            stats['unchanged'] += len(hashes) - len(changed)
+            if not changed:
+                continue
+
+            existing = set(model.objects.filter(
+                pk__in=changed).values_list('pk', flat=True))
+            objects = [
+                model(**convert_row(field_map, hashes[pk][1]))
+                for pk in changed
+            ]
+            new = [obj for obj in objects if obj.pk not in existing]
+            updated = [obj for obj in objects if obj.pk in existing]
+            stats['inserted'] += len(new)
+            stats['updated'] += len(updated)
+            if dry_run:
+                continue
+
+            with transaction.atomic():
+                model.objects.bulk_create(new)
+                if updated and update_fields:
+                    model.objects.bulk_update(updated, update_fields)
+                ImportedRow.objects.filter(
+                    table=label, object_id__in=changed).delete()
+                ImportedRow.objects.bulk_create(
+                    ImportedRow(table=label, object_id=pk,
+                                row_hash=hashes[pk][0])
+                    for pk in changed
+                )
+                if model is Title:
+                    # обработчики сигнала обновляют поисковый индекс,
+                    # автодополнение и кэш и для изменённых произведений
+                    titles_bulk_created.send(sender=Title, instances=objects)
+
+    stale = [
+        object_id for object_id in ImportedRow.objects.filter(
+            table=label).values_list('object_id', flat=True).iterator()
+        if object_id not in seen
+    ]
+    return stats, stale
+
+
+def delete_rows(model, ids, chunk_size, dry_run=False):
+    """
+    Удаляет строки, пропавшие из csv, вместе с их хэшами.
+    Удаление идёт через ORM, поэтому сигналы (агрегаты оценок,
+    поисковый индекс) и каскады отрабатывают как обычно.
+    """
+    if dry_run:
+        return
+    label = model._meta.label
+    for chunk in chunked(ids, chunk_size):
+        with transaction.atomic():
+            model.objects.filter(pk__in=chunk).delete()
+            ImportedRow.objects.filter(
+                table=label, object_id__in=chunk).delete()
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from api.asgi import CatalogASGIHandler
+from api.benchmark import run_asgi, run_wsgi
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает чтение каталога через WSGI, стандартный ASGI '
+        'обработчик Django и CatalogASGIHandler при множестве медленных '
+        'клиентов. Запросы выполняются к текущей базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/api/v1/titles/',
+            help='Адрес запроса. По умолчанию: /api/v1/titles/',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=100,
+            help='Число одновременных клиентов',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=5,
+            help='Число запросов от каждого клиента',
+        )
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=0.05,
+            help='Время получения ответа клиентом в секундах',
+        )
+        parser.add_argument(
+            '--wsgi-threads',
+            type=int,
+            default=settings.ASYNC_READ_WORKERS,
+            help='Число потоков WSGI сервера',
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help=(
+                'Добавлять к адресу уникальный параметр, чтобы ответы '
+                'не брались из кэша'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if min(options['clients'], options['requests'],
+               options['wsgi_threads']) < 1:
+            raise CommandError(
+                '--clients, --requests и --wsgi-threads должны быть '
+                'положительными')
+        path = options['path']
+
+        def urls(number, index):
+            if not options['no_cache']:
+                return path
+            separator = '&' if '?' in path else '?'
+            return f'{path}{separator}bench={number}-{index}'
+
+        load = (options['clients'], options['requests'],
+                options['client_delay'])
+        self.stdout.write(
+            f'{path}: клиентов {options["clients"]}, '
+            f'запросов от клиента {options["requests"]}, '
+            f'получение ответа {options["client_delay"] * 1000:.0f} мс'
+        )
+        results = (
+            run_wsgi(f'wsgi ({options["wsgi_threads"]} потоков)',
+                     WSGIHandler(), urls, *load, options['wsgi_threads']),
+            run_asgi('asgi (Django)', ASGIHandler(), urls, *load),
+            run_asgi(f'asgi (пул чтения {settings.ASYNC_READ_WORKERS})',
+                     CatalogASGIHandler(), urls, *load),
+        )
+        for result in results:
+            self.stdout.write(str(result))
@@ -0,0 +1,127 @@
+import os
+import random
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test.utils import override_settings
+
+from api.benchmark import run_mixed
+from api.models import Comment, Review, Title, YamDBUser
+from api.writer import get_writer, run_write
+
+# профиль SQLite и запись через поток-писатель (SERIALIZED_WRITES)
+RUNS = (
+    ('default', False),
+    ('default', True),
+    ('production', False),
+    ('production', True),
+)
+
+
+def copy_database(source, target, journal_mode):
+    """
+    Копия базы через backup API SQLite (корректна и для базы в WAL).
+    """
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+        dst.execute(f'PRAGMA journal_mode = {journal_mode}')
+    finally:
+        src.close()
+        dst.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает одновременные чтения и записи в SQLite в обычном '
+        'профиле и в профиле production (WAL, настройки соединений, '
+        'постоянные соединения), в том числе с записью через '
+        'поток-писатель. Замер идёт на копиях текущей базы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=8,
+            help='Число читающих потоков',
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=2,
+            help='Число пишущих потоков',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Длительность замера каждого профиля в секундах',
+        )
+
+    def handle(self, *args, **options):
+        default = connections['default'].settings_dict
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Замер выполняется только для SQLite')
+        if not os.path.exists(default['NAME']):
+            raise CommandError(f'Нет базы {default["NAME"]}')
+        if options['readers'] < 0 or options['writers'] < 0 or (
+                options['readers'] + options['writers'] == 0):
+            raise CommandError('Нужен хотя бы один читатель или писатель')
+
+        review_ids = list(Review.objects.values_list('pk', flat=True))
+        user_ids = list(YamDBUser.objects.values_list('pk', flat=True))
+        if options['writers'] and not (review_ids and user_ids):
+            raise CommandError(
+                'Для записи нужны отзывы и пользователи: '
+                'загрузите данные командой import_data')
+
+        def read(alias):
+            list(Title.objects.using(alias).select_related('category')
+                 .order_by('-rating', 'id')[:20])
+
+        def create_comment(alias):
+            with transaction.atomic(using=alias):
+                Comment.objects.using(alias).create(
+                    review_id=random.choice(review_ids),
+                    author_id=random.choice(user_ids),
+                    text='benchmark',
+                )
+
+        def write(alias):
+            run_write(create_comment, alias, using=alias)
+
+        self.stdout.write(
+            f'читателей {options["readers"]}, писателей '
+            f'{options["writers"]}, {options["duration"]} с на профиль'
+        )
+        for profile, serialized in RUNS:
+            name = f'{profile} + писатель' if serialized else profile
+            with tempfile.TemporaryDirectory(prefix='yamdb-bench-') as tmp:
+                path = os.path.join(tmp, 'db.sqlite3')
+                journal_mode = 'WAL' if profile == 'production' else 'DELETE'
+                copy_database(default['NAME'], path, journal_mode)
+                alias = f'bench_{profile}_{int(serialized)}'
+                connections.databases[alias] = dict(
+                    default,
+                    NAME=path,
+                    CONN_MAX_AGE=(
+                        settings.SQLITE_CONN_MAX_AGE
+                        if profile == 'production' else 0),
+                )
+                try:
+                    with override_settings(SQLITE_PROFILE=profile,
+                                           SERIALIZED_WRITES=serialized):
+                        results = run_mixed(
+                            name, alias, read, write,
+                            options['readers'], options['writers'],
+                            options['duration'],
+                        )
+                finally:
+                    get_writer(alias).stop()
+                    del connections.databases[alias]
+            for result in results:
+                self.stdout.write(str(result))
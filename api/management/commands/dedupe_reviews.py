@@ -0,0 +1,55 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+
+from api.models import Comment, Review
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает повторные отзывы автора на одно произведение и с '
+        '--delete удаляет все, кроме самого раннего, вместе с их '
+        'комментариями, после чего пересчитывает рейтинги'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Удалить повторные отзывы, оставив самый ранний',
+        )
+
+    def handle(self, *args, **options):
+        duplicates = Review.objects.values('author_id', 'title_id').annotate(
+            first_id=Min('id'), count=Count('id')
+        ).filter(count__gt=1).order_by('title_id', 'author_id')
+
+        extra_ids = []
+        for item in duplicates:
+            ids = list(Review.objects.filter(
+                author_id=item['author_id'], title_id=item['title_id'],
+                id__gt=item['first_id'],
+            ).order_by('id').values_list('id', flat=True))
+            comments = Comment.objects.filter(review_id__in=ids).count()
+            self.stdout.write(
+                f'author={item["author_id"]}, title={item["title_id"]}: '
+                f'остаётся отзыв {item["first_id"]}, повторные {ids}, '
+                f'их комментариев: {comments}'
+            )
+            extra_ids.extend(ids)
+
+        if not extra_ids:
+            self.stdout.write(self.style.SUCCESS('Повторных отзывов нет'))
+            return
+        if not options['delete']:
+            self.stdout.write(
+                f'Повторных отзывов: {len(extra_ids)}. '
+                'Для удаления запустите с --delete')
+            return
+
+        with transaction.atomic():
+            Review.objects.filter(pk__in=extra_ids).delete()
+        call_command('rebuild_ratings', verbosity=0)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено повторных отзывов: {len(extra_ids)}'))
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди исходящих писем пачками через одно '
+        'соединение с почтовым сервером. Без --once работает постоянно '
+        'и проверяет очередь каждые --interval секунд'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Отправить готовые письма и завершиться',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+            help='Пауза между проверками очереди в секундах',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Число писем, отправляемых через одно соединение',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        if options['interval'] <= 0:
+            raise CommandError('--interval должен быть положительным')
+        while True:
+            sent, failed = deliver_pending(options['batch_size'])
+            if sent or failed or options['once']:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, ошибок: {failed}')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,67 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exporter import (CONTENT_TYPES, EXPORT_TABLES, export_filename,
+                          export_stream)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка таблиц в csv или NDJSON файлы '
+        'в формате data/*.csv'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables',
+            nargs='*',
+            help=(
+                'Таблицы для выгрузки: {}. По умолчанию: все'.format(
+                    ', '.join(EXPORT_TABLES))
+            ),
+        )
+        parser.add_argument(
+            '-o', '--output',
+            default=os.path.join(settings.BASE_DIR, 'export'),
+            help='Папка для файлов выгрузки. По умолчанию: export/',
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(CONTENT_TYPES),
+            default='csv',
+            help='Формат файлов. По умолчанию: csv',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы в gzip',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.EXPORT_CHUNK_SIZE,
+            help='Число строк, читаемых из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(EXPORT_TABLES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные таблицы: {", ".join(sorted(unknown))}')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        os.makedirs(options['output'], exist_ok=True)
+        for table in options['tables'] or EXPORT_TABLES:
+            path = os.path.join(options['output'], export_filename(
+                table, options['format'], options['gzip']))
+            size = 0
+            with open(path, 'wb') as output:
+                for data in export_stream(
+                        table, options['format'], options['gzip'],
+                        options['chunk_size']):
+                    output.write(data)
+                    size += len(data)
+            self.stdout.write(f'{path}: {size} байт')
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена'))
@@ -0,0 +1,147 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import (TABLE_CONFIG, delete_rows, fast_load, load_table,
+                          load_tables_parallel, sync_table)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая загрузка данных из csv файлов в базу данных '
+        'через ORM (bulk_create пачками)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-d', '--data',
+            default=os.path.join(settings.BASE_DIR, 'data'),
+            help='Путь до папки с csv файлами. По умолчанию: data/',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Число строк в одной пачке bulk_create. По умолчанию: 5000',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help=(
+                'Число процессов для параллельного разбора csv. '
+                'По умолчанию: 0 - разбор в текущем процессе'
+            ),
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'Инкрементальная загрузка: записываются только новые и '
+                'изменившиеся строки, строки, пропавшие из csv, удаляются'
+            ),
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Режим холостого запуска: только чтение и проверка csv',
+        )
+
+    def get_tables(self, data_dir):
+        tables = []
+        for model, filename in TABLE_CONFIG:
+            path = os.path.join(data_dir, f'{filename}.csv')
+            if not os.path.exists(path):
+                self.stdout.write(f'{filename}.csv не найден, пропускаем')
+                continue
+            tables.append((model, path))
+        return tables
+
+    def load_sequential(self, tables, options):
+        for model, path in tables:
+            count, elapsed = load_table(
+                model, path, options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+            self.report(model, count, elapsed)
+
+    def load_parallel(self, tables, options):
+        results = load_tables_parallel(
+            tables, options['chunk_size'], options['workers'],
+            dry_run=options['dry_run'],
+        )
+        for model, count, parse_time, write_time in results:
+            self.report(model, count, write_time, parse_time)
+
+    def load_incremental(self, tables, options):
+        stale = []
+        for model, path in tables:
+            start = time.perf_counter()
+            stats, ids = sync_table(
+                model, path, options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+            stale.append((model, ids))
+            self.stdout.write(
+                f'{model._meta.db_table}: '
+                f'добавлено {stats["inserted"]}, '
+                f'обновлено {stats["updated"]}, '
+                f'без изменений {stats["unchanged"]}, '
+                f'удалено {len(ids)} '
+                f'за {time.perf_counter() - start:.2f} с'
+            )
+        # удаляем от зависимых таблиц к главным, чтобы каскад не
+        # задевал строки, которые ещё есть в csv
+        for model, ids in reversed(stale):
+            delete_rows(
+                model, ids, options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+
+    def report(self, model, count, elapsed, parse_time=None):
+        rate = count / elapsed if elapsed else count
+        message = (
+            f'{model._meta.db_table}: {count} строк '
+            f'за {elapsed:.2f} с ({rate:.0f} строк/с)'
+        )
+        if parse_time is not None:
+            message += f', разбор в пуле {parse_time:.2f} с'
+        self.stdout.write(message)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        if options['workers'] < 0:
+            raise CommandError('--workers не может быть отрицательным')
+        if options['workers'] and options['incremental']:
+            raise CommandError(
+                '--workers и --incremental нельзя использовать вместе')
+
+        tables = self.get_tables(options['data'])
+        with fast_load():
+            try:
+                if options['incremental']:
+                    self.load_incremental(tables, options)
+                elif options['workers']:
+                    self.load_parallel(tables, options)
+                else:
+                    self.load_sequential(tables, options)
+            except (ValueError, ValidationError) as e:
+                raise CommandError(f'Ошибка в данных: {e}')
+
+        if options['dry_run']:
+            return
+
+        # bulk_create не вызывает save() и сигналы: пересчитываем
+        # производные данные и сбрасываем кэш ответов
+        call_command('rebuild_ratings', stdout=self.stdout)
+        if not options['incremental']:
+            # при инкрементальной загрузке индекс обновляют сигналы
+            call_command('rebuild_search_index', stdout=self.stdout)
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from api.models import (SCORE_RANGE, Review, Title, histogram_field,
+                        score_histograms, weighted_rating)
+
+HISTOGRAM_FIELDS = [histogram_field(score) for score in SCORE_RANGE]
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает агрегаты оценок (score_sum, score_count, rating, '
+        'weighted_rating и гистограмму оценок) для всех произведений '
+        'по таблице отзывов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить агрегаты, ничего не меняя в базе',
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            item['title_id']: (item['total'], item['count'])
+            for item in Review.objects.values('title_id').annotate(
+                total=Sum('score'), count=Count('id'))
+        }
+        histograms = score_histograms(Review.objects.all())
+
+        mismatched = []
+        titles = Title.objects.only(
+            'id', 'score_sum', 'score_count', 'rating', 'weighted_rating',
+            *HISTOGRAM_FIELDS)
+        for title in titles.iterator():
+            total, count = expected.get(title.id, (0, 0))
+            rating = (total / count) if count else None
+            weighted = weighted_rating(total, count)
+            histogram = histograms.get(title.id, {})
+            histogram = {
+                field: histogram.get(field, 0) for field in HISTOGRAM_FIELDS
+            }
+            current = {
+                field: getattr(title, field) for field in HISTOGRAM_FIELDS
+            }
+            if (title.score_sum, title.score_count, title.rating,
+                    title.weighted_rating, current) != (
+                    total, count, rating, weighted, histogram):
+                mismatched.append(
+                    (title.id, total, count, rating, weighted, histogram))
+
+        if options['check'] or options['verbosity'] > 1:
+            for title_id, total, count, _, _, histogram in mismatched:
+                self.stdout.write(
+                    f'Title {title_id}: ожидается sum={total}, '
+                    f'count={count}, '
+                    f'histogram={list(histogram.values())}'
+                )
+
+        if options['check']:
+            if mismatched:
+                raise CommandError(
+                    f'Найдено расхождений в агрегатах: {len(mismatched)}')
+            self.stdout.write(self.style.SUCCESS('Агрегаты корректны'))
+            return
+
+        with transaction.atomic():
+            for (title_id, total, count, rating, weighted,
+                 histogram) in mismatched:
+                Title.objects.filter(pk=title_id).update(
+                    score_sum=total, score_count=count, rating=rating,
+                    weighted_rating=weighted, **histogram)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено произведений: {len(mismatched)}'))
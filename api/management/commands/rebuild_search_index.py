@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс произведений (SQLite FTS5)'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(
+                'Полнотекстовый индекс используется только для SQLite')
+            return
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен'))
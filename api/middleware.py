@@ -0,0 +1,146 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    """
+    Статистика одного запроса: число SQL запросов и время по этапам.
+
+    Объект подключается к соединениям через execute_wrapper и считает
+    все запросы, выполненные во время обработки. Время сериализации
+    замеряют сами сериализаторы (см. serializers.ServerTimingMixin).
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = None
+        self.render_time = None
+        self.total_time = 0.0
+        self._serializing = 0
+        self._render_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    @contextmanager
+    def serializing(self):
+        """
+        Замер to_representation сериализатора за вычетом SQL.
+        Вложенные сериализаторы учтены во времени внешнего.
+        """
+        outer = not self._serializing
+        self._serializing += 1
+        start = time.perf_counter()
+        db_start = self.db_time
+        try:
+            yield
+        finally:
+            self._serializing -= 1
+            if outer:
+                elapsed = (
+                    time.perf_counter() - start -
+                    (self.db_time - db_start)
+                )
+                self.serializer_time = (
+                    (self.serializer_time or 0.0) + max(elapsed, 0.0))
+
+    def render_started(self):
+        self._render_start = time.perf_counter()
+
+    def render_finished(self, response):
+        self.render_time = time.perf_counter() - self._render_start
+
+    def server_timing(self):
+        metrics = [
+            ('db', self.db_time, f'{self.queries} queries'),
+            ('serialize', self.serializer_time, None),
+            ('render', self.render_time, None),
+            ('total', self.total_time, None),
+        ]
+        items = []
+        for name, duration, description in metrics:
+            if duration is None:
+                continue
+            item = f'{name};dur={duration * 1000:.2f}'
+            if description:
+                item += f';desc="{description}"'
+            items.append(item)
+        return ', '.join(items)
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет число SQL запросов, время в базе, в сериализации и в
+    рендеринге для запросов к API и отдаёт их в заголовке Server-Timing.
+
+    Если для маршрута задан бюджет запросов в settings.QUERY_BUDGETS
+    (ключ url_name из api/urls.py для чтения или 'METHOD url_name' для
+    записи), то превышение логируется, а при
+    settings.QUERY_BUDGET_RAISE = True вызывает QueryBudgetExceeded
+    (используется в тестах).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(settings.SERVER_TIMING_PATH_PREFIX):
+            return self.get_response(request)
+
+        stats = RequestStats()
+        request.request_stats = stats
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(stats))
+            response = self.get_response(request)
+        stats.total_time = time.perf_counter() - start
+
+        response['Server-Timing'] = stats.server_timing()
+        self.check_budget(request, stats)
+        return response
+
+    def process_template_response(self, request, response):
+        stats = getattr(request, 'request_stats', None)
+        if stats is not None:
+            stats.render_started()
+            response.add_post_render_callback(stats.render_finished)
+        return response
+
+    def check_budget(self, request, stats):
+        match = request.resolver_match
+        if match is None:
+            return
+        budgets = settings.QUERY_BUDGETS
+        budget = budgets.get(f'{request.method} {match.url_name}')
+        if budget is None and request.method in SAFE_METHODS:
+            budget = budgets.get(
+                match.url_name, settings.QUERY_BUDGET_DEFAULT)
+        if budget is None or stats.queries <= budget:
+            return
+        message = (
+            f'{request.method} {request.path} ({match.url_name}): '
+            f'{stats.queries} SQL запросов при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+def fill_score_aggregates(apps, schema_editor):
+    Title = apps.get_model('api', 'Title')
+    Review = apps.get_model('api', 'Review')
+    aggregates = Review.objects.values('title_id').annotate(
+        total=models.Sum('score'), count=models.Count('id'))
+    for item in aggregates:
+        Title.objects.filter(pk=item['title_id']).update(
+            score_sum=item['total'],
+            score_count=item['count'],
+            rating=item['total'] / item['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_auto_20201108_1745'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_score_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_title_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('row_hash', models.CharField(max_length=40)),
+            ],
+            options={
+                'verbose_name': 'Загруженная строка',
+                'verbose_name_plural': 'Загруженные строки',
+                'unique_together': {('table', 'object_id')},
+            },
+        ),
+    ]
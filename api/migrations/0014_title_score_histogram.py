@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def fill_score_histograms(apps, schema_editor):
+    Title = apps.get_model('api', 'Title')
+    Review = apps.get_model('api', 'Review')
+    counts = Review.objects.values('title_id', 'score').annotate(
+        count=models.Count('id'))
+    for item in counts:
+        if 1 <= item['score'] <= 10:
+            Title.objects.filter(pk=item['title_id']).update(
+                **{f'score_{item["score"]}_count': item['count']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_importedrow'),
+    ]
+
+    operations = [
+        *(
+            migrations.AddField(
+                model_name='title',
+                name=f'score_{score}_count',
+                field=models.PositiveIntegerField(
+                    default=0, editable=False),
+            )
+            for score in range(1, 11)
+        ),
+        migrations.RunPython(fill_score_histograms, migrations.RunPython.noop),
+    ]
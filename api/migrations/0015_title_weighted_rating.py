@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_weighted_rating(apps, schema_editor):
+    Title = apps.get_model('api', 'Title')
+    prior_reviews = settings.TOP_TITLES_PRIOR_REVIEWS
+    prior_total = prior_reviews * settings.TOP_TITLES_PRIOR_MEAN
+    Title.objects.filter(score_count__gt=0).update(
+        weighted_rating=(
+            (models.functions.Cast('score_sum', models.FloatField()) +
+             prior_total) /
+            (models.F('score_count') + prior_reviews)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_title_score_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['weighted_rating', 'id'],
+                               name='api_title_top_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'weighted_rating', 'id'],
+                               name='api_title_cat_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['score_count', 'id'],
+                               name='api_title_top_reviews_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'score_count', 'id'],
+                               name='api_title_cat_reviews_idx'),
+        ),
+        migrations.RunPython(fill_weighted_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+from django.core.management.base import CommandError
+from django.db import migrations, models
+
+# сколько повторных отзывов перечислять в сообщении об ошибке
+MAX_LISTED_DUPLICATES = 20
+
+
+def check_duplicate_reviews(apps, schema_editor):
+    """
+    Уникальный индекс (author, title) нельзя создать, пока в базе есть
+    повторные отзывы автора на одно произведение. Удалять их (вместе с
+    комментариями) молча при migrate нельзя, поэтому миграция
+    останавливается и перечисляет их: повторы нужно разобрать вручную
+    или командой dedupe_reviews.
+    """
+    Review = apps.get_model('api', 'Review')
+    duplicates = list(
+        Review.objects.values('author_id', 'title_id').annotate(
+            count=models.Count('id')
+        ).filter(count__gt=1).order_by('title_id', 'author_id')
+    )
+    if not duplicates:
+        return
+    lines = [
+        f'  author={item["author_id"]}, title={item["title_id"]}: '
+        f'{item["count"]} отзыва(ов)'
+        for item in duplicates[:MAX_LISTED_DUPLICATES]
+    ]
+    if len(duplicates) > MAX_LISTED_DUPLICATES:
+        lines.append(f'  ... и ещё {len(duplicates) - MAX_LISTED_DUPLICATES}')
+    raise CommandError(
+        f'Найдено повторных отзывов (автор, произведение): '
+        f'{len(duplicates)}\n' + '\n'.join(lines) + '\n'
+        'Уникальный индекс отзывов не создан. Разберите повторы вручную '
+        'или посмотрите их командой "python manage.py dedupe_reviews" и '
+        'удалите более поздние командой '
+        '"python manage.py dedupe_reviews --delete" (вместе с их '
+        'комментариями), затем повторите migrate.'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_title_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_reviews,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(
+                fields=('author', 'title'),
+                name='unique_review_author_title'),
+        ),
+    ]
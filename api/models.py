@@ -1,9 +1,15 @@
+import threading
 import uuid
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+from django.dispatch import Signal
+from django.utils import timezone
 
 
 class YamDBUser(AbstractUser):
@@ -100,15 +106,116 @@ class Title(models.Model):
                                  on_delete=models.SET_NULL,
                                  verbose_name='Категория',
                                  related_name='titles')
+    # агрегаты оценок поддерживаются инкрементально при записи Review,
+    # чтобы список произведений не считал Avg() по всем отзывам
+    score_sum = models.PositiveIntegerField(default=0, editable=False)
+    score_count = models.PositiveIntegerField(default=0, editable=False)
+    rating = models.FloatField(blank=True, null=True, editable=False)
+    # байесовский рейтинг для топа (см. weighted_rating)
+    weighted_rating = models.FloatField(
+        blank=True, null=True, editable=False)
+    # гистограмма оценок: число отзывов с оценкой 1, 2, ..., 10
+    score_1_count = models.PositiveIntegerField(default=0, editable=False)
+    score_2_count = models.PositiveIntegerField(default=0, editable=False)
+    score_3_count = models.PositiveIntegerField(default=0, editable=False)
+    score_4_count = models.PositiveIntegerField(default=0, editable=False)
+    score_5_count = models.PositiveIntegerField(default=0, editable=False)
+    score_6_count = models.PositiveIntegerField(default=0, editable=False)
+    score_7_count = models.PositiveIntegerField(default=0, editable=False)
+    score_8_count = models.PositiveIntegerField(default=0, editable=False)
+    score_9_count = models.PositiveIntegerField(default=0, editable=False)
+    score_10_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        # индексы под сортировку списка (?ordering=) и топы /titles/top/:
+        # общие и с фильтром по категории или году
+        indexes = (
+            models.Index(fields=('rating', 'id'),
+                         name='api_title_rating_idx'),
+            models.Index(fields=('year', 'id'),
+                         name='api_title_year_idx'),
+            models.Index(fields=('name', 'id'),
+                         name='api_title_name_idx'),
+            models.Index(fields=('category', 'rating', 'id'),
+                         name='api_title_cat_rating_ord_idx'),
+            models.Index(fields=('category', 'year', 'id'),
+                         name='api_title_cat_year_idx'),
+            models.Index(fields=('year', 'rating', 'id'),
+                         name='api_title_year_rating_idx'),
+            models.Index(fields=('year', 'score_count', 'id'),
+                         name='api_title_year_reviews_idx'),
+            models.Index(fields=('weighted_rating', 'id'),
+                         name='api_title_top_rating_idx'),
+            models.Index(fields=('category', 'weighted_rating', 'id'),
+                         name='api_title_cat_rating_idx'),
+            models.Index(fields=('score_count', 'id'),
+                         name='api_title_top_reviews_idx'),
+            models.Index(fields=('category', 'score_count', 'id'),
+                         name='api_title_cat_reviews_idx'),
+        )
 
     def __str__(self):
         title = f'Произведение {self.name}'
         return title
 
+    @property
+    def score_histogram(self):
+        return [
+            getattr(self, histogram_field(score)) for score in SCORE_RANGE
+        ]
+
+    def score_percentile(self, percent):
+        """
+        Перцентиль оценок по гистограмме с линейной интерполяцией
+        между соседними по рангу оценками (для 50 - медиана).
+        """
+        histogram = self.score_histogram
+        total = sum(histogram)
+        if not total:
+            return None
+        rank = (total - 1) * percent / 100
+        lower = score_at_rank(histogram, int(rank))
+        upper = score_at_rank(histogram, min(int(rank) + 1, total - 1))
+        return lower + (upper - lower) * (rank - int(rank))
+
+
+SCORE_RANGE = range(1, 11)
+
+
+def histogram_field(score):
+    return f'score_{score}_count'
+
+
+def weighted_rating(total, count):
+    """
+    Байесовский рейтинг: средняя оценка, сглаженная к априорной
+    средней TOP_TITLES_PRIOR_MEAN с весом TOP_TITLES_PRIOR_REVIEWS
+    отзывов, чтобы произведения с одним отзывом не занимали верх топа.
+    Без отзывов - None.
+    """
+    if not count:
+        return None
+    prior_reviews = settings.TOP_TITLES_PRIOR_REVIEWS
+    prior_total = prior_reviews * settings.TOP_TITLES_PRIOR_MEAN
+    return (total + prior_total) / (count + prior_reviews)
+
+
+def score_at_rank(histogram, rank):
+    # оценка отзыва с номером rank в отсортированном по оценке списке
+    for score, count in zip(SCORE_RANGE, histogram):
+        if rank < count:
+            return score
+        rank -= count
+    return SCORE_RANGE[-1]
+
+
+# bulk_create не посылает post_save, поэтому массовое создание
+# произведений сообщает о себе отдельным сигналом (аргумент instances),
+# чтобы обновить поисковые индексы и кэши
+titles_bulk_created = Signal()
+
 
 class Review(models.Model):
     validat = (
@@ -135,11 +242,178 @@ class Review(models.Model):
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
+        # один отзыв пользователя на произведение проверяет база,
+        # без предварительного SELECT (см. ReviewViewSet.perform_create)
+        constraints = (
+            models.UniqueConstraint(fields=('author', 'title'),
+                                    name='unique_review_author_title'),
+        )
 
     def __str__(self):
         review = f'Отзыв {self.author} на {self.title}'
         return review
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # запоминаем оценку из базы, чтобы при сохранении
+        # применить к агрегатам Title только разницу. отложенное поле
+        # (only/defer) не загружаем: save и удаление обрабатывают None
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        old_score = getattr(self, '_loaded_score', None)
+        with transaction.atomic():
+            if created:
+                # агрегаты обновляются до INSERT: UPDATE заодно проверяет,
+                # что произведение существует, без отдельного SELECT.
+                # при ошибке INSERT (повторный отзыв) откатываются оба
+                if not apply_score_delta(
+                        self.title_id, self.score, 1, {self.score: 1}):
+                    raise Title.DoesNotExist(
+                        f'Произведение {self.title_id} не найдено')
+            super().save(*args, **kwargs)
+            if not created and old_score is None:
+                rebuild_title_scores(self.title_id)
+            elif not created and old_score != self.score:
+                apply_score_delta(
+                    self.title_id, self.score - old_score, 0,
+                    {old_score: -1, self.score: 1})
+        self._loaded_score = self.__dict__.get('score')
+
+
+def apply_score_delta(title_id, score_delta, count_delta,
+                      histogram_delta=None):
+    """
+    Атомарно применяет изменение суммы и количества оценок к Title.
+    Рейтинги и гистограмма (histogram_delta: {оценка: изменение})
+    пересчитываются в том же UPDATE. Возвращает число обновлённых
+    строк: 0, если произведения нет.
+    """
+    new_sum = F('score_sum') + score_delta
+    new_count = F('score_count') + count_delta
+    histogram = {
+        histogram_field(score): F(histogram_field(score)) + delta
+        for score, delta in (histogram_delta or {}).items()
+        if score in SCORE_RANGE and delta
+    }
+    prior_reviews = settings.TOP_TITLES_PRIOR_REVIEWS
+    prior_total = prior_reviews * settings.TOP_TITLES_PRIOR_MEAN
+    return Title.objects.filter(pk=title_id).update(
+        score_sum=new_sum,
+        score_count=new_count,
+        rating=Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+        # NULL при нуле отзывов, как и rating
+        weighted_rating=(
+            (Cast(new_sum, FloatField()) + prior_total) /
+            (NullIf(new_count, 0) + prior_reviews)
+        ),
+        **histogram,
+    )
+
+
+def score_histograms(reviews):
+    """
+    Гистограммы оценок по queryset'у отзывов одним GROUP BY:
+    {title_id: {поле гистограммы: число отзывов}}.
+    """
+    histograms = {}
+    counts = reviews.values('title_id', 'score').annotate(
+        count=models.Count('id'))
+    for item in counts:
+        if item['score'] in SCORE_RANGE:
+            histograms.setdefault(item['title_id'], {})[
+                histogram_field(item['score'])] = item['count']
+    return histograms
+
+
+def rebuild_title_scores(title_id):
+    """
+    Полный пересчёт агрегатов оценок одного Title по таблице Review.
+    """
+    reviews = Review.objects.filter(title_id=title_id)
+    aggregate = reviews.aggregate(
+        total=models.Sum('score'), count=models.Count('id'))
+    total = aggregate['total'] or 0
+    count = aggregate['count']
+    histogram = dict.fromkeys(map(histogram_field, SCORE_RANGE), 0)
+    histogram.update(score_histograms(reviews).get(title_id, {}))
+    Title.objects.filter(pk=title_id).update(
+        score_sum=total,
+        score_count=count,
+        rating=(total / count) if count else None,
+        weighted_rating=weighted_rating(total, count),
+        **histogram,
+    )
+
+
+# удаление отзыва, в том числе каскадное (при удалении автора или
+# произведения), выполняется Collector'ом внутри транзакции: сначала
+# pre_delete для всех удаляемых объектов, затем DELETE всех отзывов и
+# post_delete для каждого. Оценки отзывов копятся в pre_delete и на
+# первом post_delete применяются одним UPDATE на произведение, а не
+# одним на отзыв
+EXISTING_CHECK_CHUNK_SIZE = 500
+
+
+class DeletingReviews(threading.local):
+
+    def __init__(self):
+        # pk -> отзыв, ожидающий post_delete
+        self.reviews = {}
+
+
+deleting_reviews = DeletingReviews()
+
+
+def review_score(review):
+    score = getattr(review, '_loaded_score', None)
+    return review.score if score is None else score
+
+
+def review_deleting(sender, instance, **kwargs):
+    # отложенную оценку можно загрузить только до удаления строки
+    if 'score' not in instance.__dict__:
+        instance.refresh_from_db(fields=['score'])
+    deleting_reviews.reviews[instance.pk] = instance
+
+
+def review_deleted(sender, instance, **kwargs):
+    pending = deleting_reviews.reviews
+    if pending.get(instance.pk) is not instance:
+        # уже учтён вместе с остальными отзывами этого удаления
+        return
+    deleting_reviews.reviews = {}
+    if len(pending) == 1:
+        score = review_score(instance)
+        apply_score_delta(instance.title_id, -score, -1, {score: -1})
+        return
+
+    # к первому post_delete удалены все отзывы этого Collector'а, а
+    # оставшиеся в базе попали сюда из откаченного удаления
+    pks = list(pending)
+    for start in range(0, len(pks), EXISTING_CHECK_CHUNK_SIZE):
+        chunk = pks[start:start + EXISTING_CHECK_CHUNK_SIZE]
+        for pk in Review.objects.filter(pk__in=chunk).values_list(
+                'pk', flat=True):
+            del pending[pk]
+
+    deltas = {}
+    for review in pending.values():
+        score = review_score(review)
+        delta = deltas.setdefault(review.title_id, [0, 0, {}])
+        delta[0] -= score
+        delta[1] -= 1
+        delta[2][score] = delta[2].get(score, 0) - 1
+    for title_id, (score_delta, count_delta, histogram) in deltas.items():
+        apply_score_delta(title_id, score_delta, count_delta, histogram)
+
+
+models.signals.pre_delete.connect(review_deleting, sender=Review)
+models.signals.post_delete.connect(review_deleted, sender=Review)
+
 
 class Comment(models.Model):
     review = models.ForeignKey(Review,
@@ -164,3 +438,52 @@ class Comment(models.Model):
         fragment = str(self.text)[:20]
         comment = f'Комментарий {self.author} с текстом {fragment}'
         return comment
+
+
+class ImportedRow(models.Model):
+    """
+    Хэш строки csv, загруженной командой import_data --incremental.
+    По нему повторная загрузка находит изменившиеся строки, не разбирая
+    и не перезаписывая остальные.
+    """
+    table = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    row_hash = models.CharField(max_length=40)
+
+    class Meta:
+        verbose_name = 'Загруженная строка'
+        verbose_name_plural = 'Загруженные строки'
+        unique_together = ('table', 'object_id')
+
+    def __str__(self):
+        return f'{self.table}:{self.object_id}'
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо в очереди на отправку (transactional outbox).
+    Запрос только записывает письмо в базу, а отправляет его команда
+    deliver_emails (см. outbox.py).
+    """
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient = models.EmailField()
+    created = models.DateTimeField(auto_now_add=True)
+    # время, раньше которого письмо не берётся в отправку:
+    # пауза между попытками или аренда письма отправителем
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = (
+            models.Index(fields=('sent_at', 'next_attempt_at'),
+                         name='api_outgoingemail_queue_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,138 @@
+"""
+Очередь исходящих писем (transactional outbox).
+
+Запрос не отправляет письмо сам, а только записывает его в таблицу
+OutgoingEmail в той же транзакции, что и остальные изменения. Поэтому
+ответ не ждёт почтовый сервер, а письмо не теряется и не уходит, если
+транзакция откатилась.
+
+Отправляет письма команда deliver_emails: она забирает пачку готовых к
+отправке писем, отправляет их через одно соединение с почтовым
+сервером и отмечает отправленные. При ошибке письмо остаётся в очереди
+и повторяется с экспоненциально растущей паузой, пока не исчерпает
+EMAIL_OUTBOX_MAX_ATTEMPTS попыток.
+
+Взятые в отправку письма арендуются: их next_attempt_at сдвигается на
+EMAIL_OUTBOX_LEASE, так что другие отправители их не берут, а если
+отправитель упал, письма вернутся в очередь по окончании аренды. На
+PostgreSQL и MySQL письма выбираются с SKIP LOCKED и отправителей
+может быть несколько; SQLite блокирует базу на запись целиком, и
+на ней достаточно одного отправителя.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def enqueue_email(subject, body, recipient, from_email=None):
+    """
+    Ставит письмо в очередь. Вызывается внутри транзакции запроса:
+    письмо попадёт в очередь только вместе с её коммитом.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        recipient=recipient,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def pending_emails(now=None):
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        next_attempt_at__lte=now or timezone.now(),
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    )
+
+
+def claim_batch(batch_size):
+    """
+    Забирает до batch_size писем из очереди и арендует их.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            pending_emails(now)
+            .select_for_update(skip_locked=True)
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        if emails:
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in emails]
+            ).update(next_attempt_at=now + timedelta(
+                seconds=settings.EMAIL_OUTBOX_LEASE))
+    return emails
+
+
+def retry_delay(attempts):
+    # пауза перед следующей попыткой удваивается после каждой ошибки
+    return timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def mark_failed(email, error, now):
+    attempts = email.attempts + 1
+    OutgoingEmail.objects.filter(pk=email.pk).update(
+        attempts=attempts,
+        next_attempt_at=now + retry_delay(attempts),
+        last_error=f'{type(error).__name__}: {error}',
+    )
+
+
+def deliver_batch(batch_size=None):
+    """
+    Отправляет одну пачку писем через одно соединение с почтовым
+    сервером. Возвращает (число отправленных, число ошибок).
+    """
+    emails = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        failed = [(email, error) for email in emails]
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email,
+                    [email.recipient], connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception as error:
+                    failed.append((email, error))
+                else:
+                    sent.append(email.pk)
+        finally:
+            connection.close()
+
+    now = timezone.now()
+    with transaction.atomic():
+        OutgoingEmail.objects.filter(pk__in=sent).update(
+            sent_at=now, last_error='')
+        for email, error in failed:
+            mark_failed(email, error, now)
+    return len(sent), len(failed)
+
+
+def deliver_pending(batch_size=None):
+    """
+    Отправляет пачками все письма, готовые к отправке.
+    Возвращает (число отправленных, число ошибок).
+    """
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = deliver_batch(batch_size)
+        total_sent += sent
+        total_failed += failed
+        if not sent and not failed:
+            return total_sent, total_failed
@@ -0,0 +1,68 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class FixedOrderingCursorPagination(CursorPagination):
+    """
+    CursorPagination, который всегда сортирует по своему ordering и не
+    берёт сортировку у OrderingFilter viewset'а: курсор корректен
+    только для уникального поля без NULL.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        return (self.ordering,)
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с опциональным режимом курсора.
+
+    По умолчанию работает как PageNumberPagination (COUNT + OFFSET).
+    Если в запросе есть параметр ?cursor= (в том числе пустой - первая
+    страница), то используется CursorPagination по индексированному полю
+    ordering: ответ содержит непрозрачные ссылки next/previous и не
+    содержит count, а глубина страницы не влияет на время запроса.
+    Параметр ?ordering в режиме курсора не учитывается.
+    """
+    cursor_query_param = 'cursor'
+    ordering = '-id'
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def get_cursor_paginator(self):
+        paginator = FixedOrderingCursorPagination()
+        paginator.cursor_query_param = self.cursor_query_param
+        paginator.ordering = self.ordering
+        paginator.page_size = self.page_size
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = self.get_cursor_paginator()
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
+
+
+class TitlePagination(OptionalCursorPagination):
+    ordering = '-id'
+
+
+class PublicationPagination(OptionalCursorPagination):
+    """
+    Пагинация для отзывов и комментариев: курсор в порядке публикации
+    по id. id растёт вместе с pub_date (auto_now_add), но в отличие от
+    pub_date уникален: при одинаковых pub_date курсор по нему пришлось
+    бы дополнять OFFSET'ом.
+    """
+    ordering = '-id'
@@ -29,6 +29,6 @@ class IsUserOrModerator(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in permissions.SAFE_METHODS or
-            obj.author == request.user or
+            obj.author_id == request.user.id or
             (request.method == 'DELETE' and request.user.is_moderator)
         )
@@ -0,0 +1,96 @@
+"""
+Кэш справочников Genre и Category в памяти процесса.
+
+Таблицы маленькие и редко меняются, а нужны на каждой фильтрации и
+записи произведений, поэтому они загружаются целиком и отдаются из
+памяти по slug и id. Кэш сбрасывается сигналами save/delete в своём
+процессе. Изменения из других процессов подхватываются по версии
+справочника (genres, categories) из общего кэша версий (см. cache.py):
+сигналы меняют её вместе с версией произведений, поэтому ответ,
+закэшированный под новой версией произведений, не может быть собран
+по старому справочнику. Без общего кэша версий изменения подхватываются
+по таймауту settings.REFERENCE_CACHE_TIMEOUT или при промахе (не чаще
+раза в секунду).
+"""
+import time
+
+from django.conf import settings
+from django.db import models, transaction
+
+from .cache import get_versions, versions_shared
+from .models import Category, Genre
+
+MISS_RELOAD_INTERVAL = 1
+
+
+class ReferenceCache:
+
+    def __init__(self, model, version_name):
+        self.model = model
+        self.version_name = version_name
+        # (по slug, по id, время загрузки, версия) заменяется целиком,
+        # поэтому читается без блокировок
+        self._state = None
+
+    def _get_version(self):
+        if not versions_shared():
+            return None
+        return get_versions([self.version_name])[0]
+
+    def _load(self, version):
+        # версия читается до загрузки: если справочник изменится во
+        # время загрузки, следующий запрос увидит новую версию
+        objects = list(self.model.objects.all())
+        self._state = (
+            {obj.slug: obj for obj in objects},
+            {obj.id: obj for obj in objects},
+            time.monotonic(),
+            version,
+        )
+        return self._state
+
+    def _get_state(self):
+        state = self._state
+        version = self._get_version()
+        if state is None or state[3] != version or (
+                time.monotonic() - state[2] >
+                settings.REFERENCE_CACHE_TIMEOUT):
+            state = self._load(version)
+        return state
+
+    def _lookup(self, index, key):
+        state = self._get_state()
+        obj = state[index].get(key)
+        if obj is None and time.monotonic() - state[2] > MISS_RELOAD_INTERVAL:
+            obj = self._load(state[3])[index].get(key)
+        return obj
+
+    def get_by_slug(self, slug):
+        return self._lookup(0, slug)
+
+    def get_by_id(self, pk):
+        if pk is None:
+            return None
+        return self._lookup(1, pk)
+
+    def invalidate(self):
+        self._state = None
+
+    def object_changed(self, sender, **kwargs):
+        # повторный сброс после коммита: иначе параллельный запрос
+        # может успеть загрузить в кэш ещё не закоммиченное состояние
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+
+genres_cache = ReferenceCache(Genre, 'genres')
+categories_cache = ReferenceCache(Category, 'categories')
+
+REFERENCES = {
+    Genre: genres_cache,
+    Category: categories_cache,
+}
+
+for signal in (models.signals.post_save, models.signals.post_delete):
+    for model, reference in REFERENCES.items():
+        signal.connect(reference.object_changed, sender=model, weak=False)
@@ -0,0 +1,120 @@
+"""
+Полнотекстовый поиск по произведениям на основе SQLite FTS5.
+
+Индекс api_title_fts (создаётся миграцией 0012) хранит name и
+description каждого Title (rowid совпадает с id произведения) и
+обновляется сигналами при сохранении и удалении. На других СУБД поиск
+откатывается на icontains.
+"""
+import re
+
+from django.db import connection, models
+
+from .models import Title, titles_bulk_created
+
+FTS_TABLE = 'api_title_fts'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def rebuild_index():
+    """
+    Полностью перестраивает индекс по таблице произведений.
+    """
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+            f'SELECT id, name, description FROM {Title._meta.db_table}'
+        )
+
+
+def index_titles(titles):
+    if not fts_available():
+        return
+    rows = [(title.id, title.name, title.description) for title in titles]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+            f'VALUES (%s, %s, %s)',
+            rows
+        )
+
+
+def unindex_title(title_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', (title_id,))
+
+
+def build_match_query(text):
+    """
+    Превращает пользовательский ввод в безопасный запрос FTS5:
+    каждое слово ищется по префиксу, все слова обязательны.
+    """
+    words = WORD_RE.findall(text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_titles(queryset, text):
+    """
+    Фильтрует queryset произведений по тексту и сортирует
+    по релевантности (bm25).
+    """
+    if not fts_available():
+        words = WORD_RE.findall(text)
+        for word in words:
+            queryset = queryset.filter(
+                models.Q(name__icontains=word) |
+                models.Q(description__icontains=word)
+            )
+        return queryset
+
+    match_query = build_match_query(text)
+    if not match_query:
+        return queryset.none()
+    title_table = Title._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {title_table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match_query],
+        select={'search_rank': f'{FTS_TABLE}.rank'},
+        order_by=['search_rank'],
+    )
+
+
+def title_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not (
+            {'name', 'description'} & set(update_fields)):
+        return
+    index_titles([instance])
+
+
+def title_deleted(sender, instance, **kwargs):
+    unindex_title(instance.id)
+
+
+def titles_created(sender, instances, **kwargs):
+    index_titles(instances)
+
+
+models.signals.post_save.connect(title_saved, sender=Title)
+models.signals.post_delete.connect(title_deleted, sender=Title)
+titles_bulk_created.connect(titles_created, sender=Title)
@@ -1,12 +1,54 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Max
 from rest_framework import serializers
 
 from . import models
+from .exporter import CONTENT_TYPES
+from .reference import REFERENCES
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class EagerLoadingMixin:
+    """
+    Декларация связей, которые нужны сериализатору для отрисовки.
+
+    Сериализатор перечисляет поля для select_related (ForeignKey) и
+    prefetch_related (ManyToMany, обратные связи), а viewset применяет
+    этот план к queryset'у, так что страница из N объектов отрисовывается
+    за постоянное число запросов, а не за 1 + 2N.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(
+                *cls.prefetch_related_fields)
+        return queryset
+
+
+class ServerTimingMixin:
+    """
+    Время to_representation (без SQL) попадает в метрику serialize
+    заголовка Server-Timing (см. middleware.RequestStats).
+    """
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        stats = getattr(request, 'request_stats', None)
+        if stats is None:
+            return super().to_representation(instance)
+        with stats.serializing():
+            return super().to_representation(instance)
+
+
+class UserSerializer(ServerTimingMixin, serializers.ModelSerializer):
     """
     Сериализация пользователя
 
@@ -62,6 +104,49 @@ class RestrictedUserSerializer(UserSerializer):
         model = User
 
 
+class ReferenceSlugRelatedField(serializers.SlugRelatedField):
+    """
+    SlugRelatedField, который ищет объекты справочника в кэше процесса
+    (см. reference.py) вместо запроса к базе на каждое значение.
+    Кэш выбирается по модели queryset'а.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(slug_field='slug', **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        reference = REFERENCES[self.queryset.model]
+        obj = reference.get_by_slug(data)
+        if obj is None:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=data)
+        return obj
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(required=True, max_length=200)
+    type = serializers.MultipleChoiceField(
+        choices=('titles', 'genres', 'categories'), required=False)
+    limit = serializers.IntegerField(
+        required=False, default=10, min_value=1, max_value=50)
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    output = serializers.ChoiceField(
+        choices=tuple(CONTENT_TYPES), required=False, default='csv')
+    gzip = serializers.BooleanField(required=False, default=False)
+
+
+class TopTitlesQuerySerializer(serializers.Serializer):
+    by = serializers.ChoiceField(
+        choices=('rating', 'reviews'), required=False, default='rating')
+    limit = serializers.IntegerField(
+        required=False, default=10, min_value=1,
+        max_value=settings.TOP_TITLES_MAX_LIMIT)
+
+
 class EmailAuthSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
 
@@ -75,31 +160,18 @@ class EmailAuthTokenOutputSerializer(serializers.Serializer):
     token = serializers.CharField(required=True)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(ServerTimingMixin, EagerLoadingMixin,
+                       serializers.ModelSerializer):
     """
-    Сериализатор для ReviewViewSet
+    Сериализатор для ReviewViewSet.
+    Повторный отзыв автора на произведение отсекает уникальный индекс
+    в базе (см. ReviewViewSet.perform_create).
     """
+    select_related_fields = ('author',)
     author = serializers.SlugRelatedField(
         slug_field='username', read_only=True
     )
 
-    def validate(self, data):
-        """
-        Валидация для проверки того,
-        был ли уже создан отзыв пользователя
-        на произведение
-        """
-        title_id = self.context.get('title_id')
-        request = self.context.get('request')
-        if (
-            request.method != 'PATCH' and
-            models.Review.objects.filter(
-                author=request.user, title_id=title_id
-            ).exists()
-        ):
-            raise serializers.ValidationError('Отзыв уже существует')
-        return data
-
     class Meta:
         fields = (
             'id',
@@ -111,10 +183,12 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = models.Review
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ServerTimingMixin, EagerLoadingMixin,
+                        serializers.ModelSerializer):
     """
     Сериализатор для CommentViewSet
     """
+    select_related_fields = ('author',)
     author = serializers.SlugRelatedField(
         slug_field='username', read_only=True
     )
@@ -129,7 +203,7 @@ class CommentSerializer(serializers.ModelSerializer):
         model = models.Comment
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(ServerTimingMixin, serializers.ModelSerializer):
     """
     Сериализация для GenreViewSet.
     """
@@ -139,7 +213,7 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class CategoriesSerializer(serializers.ModelSerializer):
+class CategoriesSerializer(ServerTimingMixin, serializers.ModelSerializer):
     """
     Сериализация для CategoryViewSet.
     """
@@ -149,35 +223,162 @@ class CategoriesSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class TitleSerializer(serializers.ModelSerializer):
+# служебные агрегаты score_sum и score_count наружу не отдаём
+TITLE_FIELDS = (
+    'id',
+    'name',
+    'year',
+    'rating',
+    'description',
+    'genre',
+    'category',
+)
+
+
+class TitleSerializer(ServerTimingMixin, EagerLoadingMixin,
+                      serializers.ModelSerializer):
     """
     Сериализация для SAFE_METHODS TitleViewSet.
     """
+    select_related_fields = ('category',)
+    prefetch_related_fields = ('genre',)
+
     rating = serializers.IntegerField(
         read_only=True, required=False, default=0)
     genre = GenreSerializer(many=True, read_only=True)
     category = CategoriesSerializer(read_only=True)
 
     class Meta:
-        fields = '__all__'
+        fields = TITLE_FIELDS
+        model = models.Title
+
+
+class TitleDetailSerializer(TitleSerializer):
+    """
+    Сериализация одного произведения: дополнительно отдаётся
+    распределение оценок, посчитанное по гистограмме в Title.
+    """
+    SCORE_PERCENTILES = (25, 50, 75, 90)
+
+    score_distribution = serializers.SerializerMethodField()
+
+    def get_score_distribution(self, obj):
+        return {
+            'histogram': obj.score_histogram,
+            'median': obj.score_percentile(50),
+            'percentiles': {
+                str(percent): obj.score_percentile(percent)
+                for percent in self.SCORE_PERCENTILES
+            },
+        }
+
+    class Meta:
+        fields = TITLE_FIELDS + ('score_distribution',)
         model = models.Title
 
 
-class CreateTitleSerializer(serializers.ModelSerializer):
+class TopTitleSerializer(TitleSerializer):
+    """
+    Сериализация произведения в топе: дополнительно отдаются
+    байесовский рейтинг и число отзывов, по которым строится топ.
+    """
+    reviews_count = serializers.IntegerField(
+        source='score_count', read_only=True)
+
+    class Meta:
+        fields = TITLE_FIELDS + ('weighted_rating', 'reviews_count')
+        model = models.Title
+
+
+class BulkCreateTitleListSerializer(serializers.ListSerializer):
+    """
+    Массовое создание произведений: все элементы проверяются за один
+    проход (slug жанров и категорий - по кэшу справочников), затем
+    произведения и связи с жанрами записываются через bulk_create
+    в одной транзакции.
+    """
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Список произведений пуст')
+        if len(attrs) > settings.BULK_TITLES_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'Не больше {settings.BULK_TITLES_MAX_ITEMS} '
+                'произведений за запрос'
+            )
+        return attrs
+
+    @staticmethod
+    def get_batch_size(model, objs):
+        """
+        BULK_TITLES_BATCH_SIZE, но не больше, чем СУБД принимает
+        параметров в одном запросе: явный batch_size bulk_create
+        не уменьшает (у SQLite предел 999 параметров).
+        """
+        limit = connection.ops.bulk_batch_size(
+            model._meta.concrete_fields, objs)
+        return max(min(settings.BULK_TITLES_BATCH_SIZE, limit), 1)
+
+    def create(self, validated_data):
+        genres = [item.pop('genre', []) for item in validated_data]
+        titles = [models.Title(**item) for item in validated_data]
+        through = models.Title.genre.through
+
+        if not titles:
+            return titles
+        batch_size = self.get_batch_size(models.Title, titles)
+
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                models.Title.objects.bulk_create(
+                    titles, batch_size=batch_size)
+                bulk = True
+            elif connection.vendor == 'sqlite':
+                # SQLite не возвращает id из bulk_create. После первой
+                # вставки транзакция держит блокировку записи всей базы,
+                # поэтому наши строки - это последние len(titles) id
+                models.Title.objects.bulk_create(
+                    titles, batch_size=batch_size)
+                last_id = models.Title.objects.aggregate(
+                    last_id=Max('id'))['last_id']
+                first_id = last_id - len(titles) + 1
+                for offset, title in enumerate(titles):
+                    title.id = first_id + offset
+                bulk = True
+            else:
+                # на остальных СУБД (MySQL) параллельные вставки могут
+                # перемежаться, и id узнать нельзя: пишем по одному
+                for title in titles:
+                    title.save()
+                bulk = False
+            links = [
+                through(title_id=title.id, genre_id=genre.id)
+                for title, title_genres in zip(titles, genres)
+                for genre in title_genres
+            ]
+            through.objects.bulk_create(
+                links, batch_size=self.get_batch_size(through, links))
+            if bulk:
+                # при save() то же делают обработчики post_save
+                models.titles_bulk_created.send(
+                    sender=models.Title, instances=titles)
+        return titles
+
+
+class CreateTitleSerializer(ServerTimingMixin, serializers.ModelSerializer):
     """
     Сериализация для POST, PATCH методов TitleViewSet.
     """
-    genre = serializers.SlugRelatedField(
+    genre = ReferenceSlugRelatedField(
         queryset=models.Genre.objects.all(),
-        slug_field='slug',
         many=True
     )
-    category = serializers.SlugRelatedField(
+    category = ReferenceSlugRelatedField(
         queryset=models.Category.objects.all(),
-        slug_field='slug',
     )
 
     class Meta:
-        fields = '__all__'
+        fields = TITLE_FIELDS
         model = models.Title
         read_only_fields = ('genre', 'category')
+        list_serializer_class = BulkCreateTitleListSerializer
@@ -0,0 +1,38 @@
+"""
+Профиль SQLite для продакшена.
+
+При SQLITE_PROFILE = 'production' каждое новое соединение с SQLite
+получает настройки SQLITE_PRODUCTION_PRAGMAS (сигнал connection_created):
+журнал WAL, в котором читатели не блокируются писателем и наоборот,
+synchronous = NORMAL (в режиме WAL fsync только при checkpoint),
+отображение файла базы в память, увеличенный кэш страниц, временные
+таблицы в памяти и ожидание блокировки вместо немедленной ошибки
+'database is locked'. Соединения при этом переиспользуются между
+запросами (CONN_MAX_AGE в settings.py), поэтому настройки применяются
+один раз на соединение.
+
+journal_mode = WAL сохраняется в самом файле базы, остальные
+настройки действуют только на соединение.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def production_pragmas():
+    if settings.SQLITE_PROFILE != 'production':
+        return {}
+    return settings.SQLITE_PRODUCTION_PRAGMAS
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = production_pragmas()
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+connection_created.connect(apply_pragmas)
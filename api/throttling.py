@@ -0,0 +1,173 @@
+"""
+Ограничение частоты запросов к auth и к созданию отзывов и комментариев
+по алгоритму token bucket.
+
+Частота задаётся как в DRF (REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+например '10/min'): ёмкость корзины - 10 запросов, и она равномерно
+наполняется за минуту, так что короткий всплеск до ёмкости проходит, а
+дальше запросы пропускаются с заданной средней частотой.
+
+Корзины хранятся в памяти процесса (LRU на THROTTLE_LOCAL_BUCKETS
+ключей), поэтому проверка не обращается ни к базе, ни к кэшу. DRF
+проверяет ограничения до вызова обработчика, и отклонённый запрос
+получает 429 с заголовком Retry-After, не доходя до базы.
+
+Если задан THROTTLE_CACHE_ALIAS, то пропущенный локальной корзиной
+запрос дополнительно проверяется корзиной в общем кэше Django, и
+ограничение действует на все процессы сервера вместе. Чтение и запись
+состояния в кэше не атомарны, поэтому при одновременных запросах
+через общую корзину может пройти на несколько запросов больше.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+KEY_PREFIX = 'throttle'
+
+
+def refill(tokens, stamp, now, capacity, duration):
+    """
+    Состояние корзины на момент now: (число токенов, разрешён ли запрос,
+    через сколько секунд появится следующий токен).
+    """
+    tokens = min(capacity, tokens + (now - stamp) * capacity / duration)
+    if tokens >= 1:
+        return tokens - 1, True, 0
+    return tokens, False, (1 - tokens) * duration / capacity
+
+
+class TokenBucketStore:
+    """
+    Корзины в памяти процесса: ключ -> (число токенов, время).
+    Хранятся последние size ключей.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, duration):
+        """
+        Забирает токен из корзины key.
+        Возвращает (разрешён ли запрос, сколько секунд ждать).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens, allowed, wait = refill(
+                tokens, stamp, now, capacity, duration)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.size:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+local_buckets = TokenBucketStore(settings.THROTTLE_LOCAL_BUCKETS)
+
+
+def take_shared(key, capacity, duration):
+    """
+    То же, что TokenBucketStore.take, но корзина хранится в общем кэше.
+    """
+    cache = caches[settings.THROTTLE_CACHE_ALIAS]
+    cache_key = f'{KEY_PREFIX}:{key}'
+    now = time.time()
+    tokens, stamp = cache.get(cache_key, (capacity, now))
+    tokens, allowed, wait = refill(tokens, stamp, now, capacity, duration)
+    # через duration корзина снова полная, дольше её хранить не нужно
+    cache.set(cache_key, (tokens, now), timeout=duration)
+    return allowed, wait
+
+
+class TokenBucketThrottle(throttling.SimpleRateThrottle):
+    """
+    Базовый класс: подклассы задают scope и get_cache_key.
+    Запросы, для которых get_cache_key вернул None, не ограничиваются.
+    """
+
+    def get_rate(self):
+        # частоты читаются при каждом запросе, а не при импорте DRF,
+        # чтобы их можно было менять в настройках тестов
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        if self.scope not in rates:
+            raise ImproperlyConfigured(
+                f'Не задана частота для scope {self.scope}')
+        return rates[self.scope]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.allowed, self.retry_after = local_buckets.take(
+            self.key, self.num_requests, self.duration)
+        if self.allowed and settings.THROTTLE_CACHE_ALIAS:
+            self.allowed, self.retry_after = take_shared(
+                self.key, self.num_requests, self.duration)
+        return self.allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """
+    Запросы к auth с одного IP адреса.
+    """
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return f'{self.scope}:{self.get_ident(request)}'
+
+
+class AuthEmailThrottle(TokenBucketThrottle):
+    """
+    Запросы к auth для одного e-mail.
+    """
+    scope = 'auth_email'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email:
+            return None
+        return f'{self.scope}:{email.strip().lower()}'
+
+
+class UserWriteThrottle(TokenBucketThrottle):
+    """
+    Создание объектов одним пользователем. scope берётся из атрибута
+    throttle_scope view, как у ScopedRateThrottle.
+    """
+    scope_attr = 'throttle_scope'
+
+    def __init__(self):
+        # scope известен только вместе с view, см. allow_request
+        pass
+
+    def allow_request(self, request, view):
+        if request.method != 'POST':
+            return True
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return f'{self.scope}:{request.user.pk}'
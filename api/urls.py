@@ -7,7 +7,7 @@ router = DefaultRouter()
 router.register(r'users', views.UsersViewSet)
 router.register(r'titles', views.TitleViewSet, basename='titles')
 router.register(r'categories', views.CategoryViewSet, basename='categories')
-router.register(r'genres', views.GenreViewSet, basename='titles')
+router.register(r'genres', views.GenreViewSet, basename='genres')
 router.register(
     r'titles/(?P<title_id>\d+)/reviews',
     views.ReviewViewSet,
@@ -28,6 +28,8 @@ auth_url_patterns = [
 v1_url_patterns = [
     path('', include(router.urls)),
     path('auth/', include(auth_url_patterns)),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+    path('export/<str:table>/', views.export, name='export'),
 ]
 
 urlpatterns = [
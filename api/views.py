@@ -1,36 +1,102 @@
-from smtplib import SMTPException
-
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import (decorators, filters, mixins, permissions, response,
                             status, viewsets)
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import GenericViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from .filters import TitleFilter
-from .models import Category, Genre, Review, Title
+from .authentication import token_for_user
+from .autocomplete import prefix_index
+from .cache import (CachedListMixin, CachedListRetrieveMixin,
+                    ConditionalGetMixin)
+from .exporter import (CONTENT_TYPES, EXPORT_TABLES, export_filename,
+                       export_stream)
+from .filters import TitleFilter, TitleFullTextFilter, TitleOrderingFilter
+from .models import Category, Comment, Genre, Review, Title
+from .outbox import enqueue_email
+from .pagination import PublicationPagination, TitlePagination
 from .permissions import AdminOnly, IsAdminOrReadOnly, IsUserOrModerator
-from .serializers import (CategoriesSerializer, CommentSerializer,
-                          CreateTitleSerializer, EmailAuthSerializer,
-                          EmailAuthTokenInputSerializer,
-                          EmailAuthTokenOutputSerializer, GenreSerializer,
+from .serializers import (AutocompleteQuerySerializer, CategoriesSerializer,
+                          CommentSerializer, CreateTitleSerializer,
+                          EmailAuthSerializer, EmailAuthTokenInputSerializer,
+                          EmailAuthTokenOutputSerializer,
+                          ExportQuerySerializer, GenreSerializer,
                           RestrictedUserSerializer, ReviewSerializer,
-                          TitleSerializer, UserSerializer)
+                          TitleDetailSerializer, TitleSerializer,
+                          TopTitleSerializer, TopTitlesQuerySerializer,
+                          UserSerializer)
+from .throttling import AuthEmailThrottle, AuthIPThrottle, UserWriteThrottle
+from .writer import SerializedWriteMixin, run_write
 
 User = get_user_model()
 
 token_generator = PasswordResetTokenGenerator()
 
 
-def _get_token_for_user(user):
-    refresh = RefreshToken.for_user(user)
-    return str(refresh.access_token)
+class EagerLoadingViewSetMixin:
+    """
+    Применяет к queryset'у план загрузки связей, объявленный
+    в сериализаторе (см. serializers.EagerLoadingMixin).
+
+    План подключается в filter_queryset, чтобы не зависеть от того,
+    как конкретный viewset строит get_queryset.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+
+class NestedParentMixin:
+    """
+    Родитель вложенного маршрута, например
+    titles/<title_id>/reviews/<review_id>/comments/.
+
+    parent_lookups связывает поля родителя (parent_model) с параметрами
+    URL. Queryset дочерних объектов фильтруется по этим полям через
+    внешний ключ parent_field, поэтому список и поиск объекта проверяют
+    всю цепочку родителей в том же запросе, не загружая родителей.
+    Сам родитель загружается одним запросом только по требованию
+    (get_parent) и запоминается на время запроса; для пустой страницы
+    списка он проверяется, чтобы отдать 404 для несуществующей цепочки.
+    """
+    parent_model = None
+    parent_field = None
+    parent_lookups = {}
+
+    def get_parent_filter(self):
+        return {
+            lookup: self.kwargs[kwarg]
+            for lookup, kwarg in self.parent_lookups.items()
+        }
+
+    def get_parent(self):
+        if getattr(self, '_parent', None) is None:
+            self._parent = get_object_or_404(
+                self.parent_model, **self.get_parent_filter())
+        return self._parent
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{
+            f'{self.parent_field}__{lookup}': value
+            for lookup, value in self.get_parent_filter().items()
+        })
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and not page:
+            self.get_parent()
+        return page
 
 
 class UsersViewSet(viewsets.ModelViewSet):
@@ -75,12 +141,35 @@ class UsersViewSet(viewsets.ModelViewSet):
         return response.Response(serializer.data)
 
 
+def queue_confirmation_email(email):
+    """
+    Создаёт неактивного пользователя, если его ещё нет, и ставит письмо
+    с кодом подтверждения в очередь в одной транзакции с ним.
+    Отправляет письмо команда deliver_emails (см. outbox.py).
+    """
+    with transaction.atomic():
+        user_object, created = User.objects.get_or_create(email=email)
+
+        if created:
+            user_object.is_active = False
+            user_object.save()
+
+        confirmation_code = token_generator.make_token(user_object)
+        enqueue_email(
+            'Получение доступа к социальной сети YamDB',
+            f'Ваш код активации: {confirmation_code}',
+            email,
+        )
+
+
 @decorators.api_view(['POST'])
+@decorators.throttle_classes((AuthIPThrottle, AuthEmailThrottle))
 def auth_send_email(request):
     """
     Первая часть алгоритма создания пользователя.
     Происходит создание неактивного пользователя.
-    Пользователю на заданный e-mail отправляется код подтверждения.
+    Пользователю на заданный e-mail отправляется код подтверждения:
+    письмо ставится в очередь и ответ не ждёт почтовый сервер.
 
     Так же этот endpoint может быть использован для повторого получания
     кода подтверждения. В этом случае статус пользователя не меняется.
@@ -90,32 +179,12 @@ def auth_send_email(request):
     input_data.is_valid(raise_exception=True)
     email = input_data.validated_data['email']
 
-    user_object, created = User.objects.get_or_create(email=email)
-
-    if created:
-        user_object.is_active = False
-        user_object.save()
-
-    confirmation_code = token_generator.make_token(user_object)
-
-    try:
-        send_mail(
-            'Получение доступа к социальной сети YamDB',
-            f'Ваш код активации: {confirmation_code}',
-            settings.DEFAULT_FROM_EMAIL,
-            [email],
-            fail_silently=False,
-        )
-    except SMTPException as e:
-        return response.Response(
-            f'Ошибка посылки e-mail: {e}',
-            status=status.HTTP_400_BAD_REQUEST
-        )
-
+    run_write(queue_confirmation_email, email)
     return response.Response(input_data.data, status=status.HTTP_200_OK)
 
 
 @decorators.api_view(['POST'])
+@decorators.throttle_classes((AuthIPThrottle, AuthEmailThrottle))
 def auth_get_token(request):
     """
     Вторая часть алгоритма создания пользователя.
@@ -139,86 +208,145 @@ def auth_get_token(request):
 
     if not user_object.is_active:
         user_object.is_active = True
-        user_object.save()
+        run_write(user_object.save, update_fields=['is_active'])
 
-    token = _get_token_for_user(user_object)
+    token = token_for_user(user_object)
 
     output_data = EmailAuthTokenOutputSerializer(data={'token': token})
     output_data.is_valid(raise_exception=True)
     return response.Response(output_data.data, status=status.HTTP_200_OK)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+@decorators.api_view(['GET'])
+def autocomplete(request):
+    """
+    Автодополнение по началу слов в названиях произведений, жанров и
+    категорий. Ответ строится по индексу в памяти, без запросов к базе.
+
+    Параметры: q - префикс, type - titles/genres/categories (можно
+    несколько раз), limit - максимальное число подсказок.
+    """
+    input_data = AutocompleteQuerySerializer(data={
+        'q': request.query_params.get('q', ''),
+        'type': request.query_params.getlist('type'),
+        'limit': request.query_params.get('limit', 10),
+    })
+    input_data.is_valid(raise_exception=True)
+    suggestions = prefix_index.search(
+        input_data.validated_data['q'],
+        kinds=input_data.validated_data.get('type'),
+        limit=input_data.validated_data['limit'],
+    )
+    return response.Response(suggestions, status=status.HTTP_200_OK)
+
+
+@decorators.api_view(['GET'])
+@decorators.permission_classes((permissions.IsAuthenticated, AdminOnly))
+def export(request, table):
+    """
+    Потоковая выгрузка таблицы в формате data/*.csv для администратора.
+
+    Параметры: output - csv или ndjson, gzip - сжать ответ в gzip.
+    Строки читаются из базы пачками по мере отправки ответа.
+    """
+    if table not in EXPORT_TABLES:
+        raise Http404
+    input_data = ExportQuerySerializer(data=request.query_params)
+    input_data.is_valid(raise_exception=True)
+    output_format = input_data.validated_data['output']
+    compress = input_data.validated_data['gzip']
+
+    content_type = CONTENT_TYPES[output_format]
+    if compress:
+        content_type = 'application/gzip'
+    stream = StreamingHttpResponse(
+        export_stream(table, output_format, compress,
+                      settings.EXPORT_CHUNK_SIZE),
+        content_type=content_type,
+    )
+    filename = export_filename(table, output_format, compress)
+    stream['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return stream
+
+
+class ReviewViewSet(ConditionalGetMixin, EagerLoadingViewSetMixin,
+                    NestedParentMixin, SerializedWriteMixin,
+                    viewsets.ModelViewSet):
     """
     Viewset для работы с Review
     """
+    queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    pagination_class = PublicationPagination
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly,
         IsUserOrModerator
     )
-
-    def get_queryset(self):
-        """
-        Viewset queryset всех reviews для title
-        """
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return title.reviews.all()
-
-    def get_serializer_context(self):
-        """
-        Получение из context-а сериализатора полей title_id и request
-        """
-        return {
-            'title_id': self.kwargs['title_id'],
-            'request': self.request
-        }
+    throttle_classes = (UserWriteThrottle,)
+    throttle_scope = 'reviews'
+    parent_model = Title
+    parent_field = 'title'
+    parent_lookups = {'pk': 'title_id'}
+
+    def get_version_names(self):
+        title_id = self.kwargs['title_id']
+        return (
+            f'titles:object:{title_id}',
+            f'reviews:title:{title_id}',
+            'users',
+        )
 
     def perform_create(self, serializer):
         """
-        Вызов CreateModelMixin
+        Отзыв создаётся без предварительных SELECT: агрегаты
+        произведения и INSERT выполняются в одной транзакции, а
+        повторный отзыв отсекает уникальный индекс (author, title).
         """
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(
-            author=self.request.user,
-            title=title
-        )
-
-
-class CommentViewSet(viewsets.ModelViewSet):
+        try:
+            run_write(
+                serializer.save,
+                author=self.request.user,
+                title_id=self.kwargs['title_id']
+            )
+        except Title.DoesNotExist:
+            raise Http404
+        except IntegrityError:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ['Отзыв уже существует']})
+
+
+class CommentViewSet(ConditionalGetMixin, EagerLoadingViewSetMixin,
+                     NestedParentMixin, SerializedWriteMixin,
+                     viewsets.ModelViewSet):
     """
     Viewset для работы с Comment
     """
+    queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    pagination_class = PublicationPagination
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly,
         IsUserOrModerator
     )
-
-    def get_queryset(self):
-        """
-        Возвращение queryset для всех комментариев к review
-        """
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id')
+    throttle_classes = (UserWriteThrottle,)
+    throttle_scope = 'comments'
+    parent_model = Review
+    parent_field = 'review'
+    parent_lookups = {'pk': 'review_id', 'title': 'title_id'}
+
+    def get_version_names(self):
+        return (
+            f'reviews:title:{self.kwargs["title_id"]}',
+            f'comments:review:{self.kwargs["review_id"]}',
+            'users',
         )
-        return review.comments.all()
 
     def perform_create(self, serializer):
         """
-        Вызов CreateModelMixin
+        Отзыв загружается с проверкой произведения одним запросом
         """
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id')
-        )
-        serializer.save(
-            author=self.request.user,
-            review=review
-        )
+        review = self.get_parent()
+        run_write(serializer.save, author=self.request.user, review=review)
 
 
 class MixinSet(
@@ -234,11 +362,12 @@ class MixinSet(
     pass
 
 
-class CategoryViewSet(MixinSet):
+class CategoryViewSet(CachedListMixin, MixinSet):
     """
     Viewset для работы с Categories
     [GET, POST, DELETE].
     """
+    cache_namespace = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategoriesSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -248,11 +377,12 @@ class CategoryViewSet(MixinSet):
     lookup_field = 'slug'
 
 
-class GenreViewSet(MixinSet):
+class GenreViewSet(CachedListMixin, MixinSet):
     """
     Viewset для работы с Genres
     [GET, POST, DELETE].
     """
+    cache_namespace = 'genres'
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -262,15 +392,23 @@ class GenreViewSet(MixinSet):
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, CachedListRetrieveMixin,
+                   EagerLoadingViewSetMixin, SerializedWriteMixin,
+                   viewsets.ModelViewSet):
     """
     viewset для работы с Titles
     [GET, POST, PATCH, DELETE].
     """
-    queryset = Title.objects.annotate(rating=Avg('reviews__score'))
+    cache_namespace = 'titles'
+    queryset = Title.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
-    pagination_class = PageNumberPagination
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    pagination_class = TitlePagination
+    filter_backends = (
+        DjangoFilterBackend,
+        filters.SearchFilter,
+        TitleFullTextFilter,
+        TitleOrderingFilter,
+    )
     filterset_class = TitleFilter
     search_fields = ('name',)
 
@@ -280,4 +418,50 @@ class TitleViewSet(viewsets.ModelViewSet):
         """
         if self.request.method in ('POST', 'PATCH'):
             return CreateTitleSerializer
+        if self.action == 'retrieve':
+            return TitleDetailSerializer
+        if self.action == 'top':
+            return TopTitleSerializer
         return TitleSerializer
+
+    @decorators.action(detail=False)
+    def top(self, request):
+        """
+        Топ произведений по байесовскому рейтингу (by=rating) или по
+        числу отзывов (by=reviews). Фильтры genre, category, year
+        работают как в списке. Значения для сортировки хранятся в Title
+        и поддерживаются при записи отзывов, поэтому топ читается по
+        индексу без агрегации отзывов.
+        """
+        return self.cached_response(self.top_titles, request)
+
+    def top_titles(self, request):
+        input_data = TopTitlesQuerySerializer(data=request.query_params)
+        input_data.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        if input_data.validated_data['by'] == 'rating':
+            queryset = queryset.filter(
+                weighted_rating__isnull=False
+            ).order_by('-weighted_rating', '-id')
+        else:
+            queryset = queryset.filter(
+                score_count__gt=0
+            ).order_by('-score_count', '-id')
+        queryset = queryset[:input_data.validated_data['limit']]
+        serializer = self.get_serializer(queryset, many=True)
+        return response.Response(serializer.data)
+
+    @decorators.action(detail=False, methods=('post',))
+    def bulk(self, request):
+        """
+        Массовое создание произведений из JSON массива.
+        В ответе отдаются только id созданных произведений, чтобы не
+        тратить запросы на вывод тысяч объектов.
+        """
+        serializer = CreateTitleSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        titles = run_write(serializer.save)
+        return response.Response(
+            {'count': len(titles), 'ids': [title.id for title in titles]},
+            status=status.HTTP_201_CREATED
+        )
@@ -0,0 +1,215 @@
+"""
+Запись в базу через единственный поток-писатель (SERIALIZED_WRITES).
+
+SQLite допускает одного писателя на всю базу, и при нескольких
+процессах и потоках сервера одновременные транзакции упираются в
+'database is locked' и повторные попытки. При SERIALIZED_WRITES = True
+write endpoint'ы не пишут в базу сами, а передают функцию записи в
+очередь писателя процесса (run_write) и ждут её результата.
+
+Писатель - отдельный поток со своим соединением. Он забирает из
+очереди накопившиеся записи (до WRITE_BATCH_SIZE, подождав следующие
+до WRITE_BATCH_WAIT миллисекунд) и выполняет их в одной транзакции,
+каждую в своей точке сохранения: ошибка одной записи откатывает только
+её, а fsync при коммите приходится на всю пачку (group commit).
+Результат или исключение записи возвращается вызывающему потоку
+только после коммита пачки.
+
+Между процессами писатели чередуются через блокировку файла
+<база>.write-lock (fcntl, SERIALIZED_WRITES_PROCESS_LOCK), поэтому
+транзакции процессов не конкурируют за блокировку SQLite.
+
+Если вызывающий поток уже внутри транзакции, запись выполняется в нём
+же: открытую транзакцию нельзя передать другому соединению.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+try:
+    import fcntl
+except ImportError:
+    # на Windows межпроцессной блокировки нет
+    fcntl = None
+
+
+@contextmanager
+def process_lock(using):
+    """
+    Блокировка записи в базу using между процессами.
+    """
+    connection = connections[using]
+    if (fcntl is None or not settings.SERIALIZED_WRITES_PROCESS_LOCK or
+            connection.vendor != 'sqlite' or connection.is_in_memory_db()):
+        yield
+        return
+    path = f'{connection.settings_dict["NAME"]}.write-lock'
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SingleWriter:
+    """
+    Поток-писатель для базы using.
+    Поток запускается при первой записи и заново после fork.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def is_writer_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        with self._lock:
+            if (self._thread is None or not self._thread.is_alive() or
+                    self._pid != os.getpid()):
+                self._start()
+            self._queue.put((func, args, kwargs, future))
+        return future
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._queue,),
+            name=f'writer-{self.using}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает поток после уже поставленных в очередь записей.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _next_batch(self, jobs):
+        job = jobs.get()
+        if job is None:
+            return None
+        batch = [job]
+        deadline = time.monotonic() + settings.WRITE_BATCH_WAIT / 1000
+        while len(batch) < settings.WRITE_BATCH_SIZE:
+            try:
+                job = jobs.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job is None:
+                # остановка после текущей пачки
+                jobs.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self, jobs):
+        try:
+            while True:
+                batch = self._next_batch(jobs)
+                if batch is None:
+                    return
+                self._commit([
+                    job for job in batch
+                    if job[3].set_running_or_notify_cancel()
+                ])
+        finally:
+            connections[self.using].close()
+
+    def _check_connection(self):
+        # соединение писателя живёт, пока оно работает, независимо от
+        # CONN_MAX_AGE: писатель один на процесс и пишет постоянно
+        connection = connections[self.using]
+        if connection.errors_occurred and not connection.is_usable():
+            connection.close()
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with process_lock(self.using):
+                with transaction.atomic(using=self.using):
+                    for func, args, kwargs, future in batch:
+                        try:
+                            with transaction.atomic(using=self.using):
+                                result = func(*args, **kwargs)
+                        except Exception as error:
+                            results.append((future, None, error))
+                        else:
+                            results.append((future, result, None))
+        except Exception as error:
+            # пачку не удалось закоммитить: ни одна запись не сохранена
+            for _, _, _, future in batch:
+                future.set_exception(error)
+            return
+        finally:
+            self._check_connection()
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(using=DEFAULT_DB_ALIAS):
+    with _writers_lock:
+        if using not in _writers:
+            _writers[using] = SingleWriter(using)
+        return _writers[using]
+
+
+def stop_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop()
+
+
+def run_write(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Выполняет функцию записи func(*args, **kwargs) через писателя базы
+    using и возвращает её результат (или выбрасывает её исключение).
+    Без SERIALIZED_WRITES функция выполняется в текущем потоке.
+    """
+    if not settings.SERIALIZED_WRITES:
+        return func(*args, **kwargs)
+    writer = get_writer(using)
+    if writer.is_writer_thread() or connections[using].in_atomic_block:
+        return func(*args, **kwargs)
+    return writer.submit(func, *args, **kwargs).result()
+
+
+class SerializedWriteMixin:
+    """
+    Создание, изменение и удаление объектов viewset'а через писателя.
+    viewset, переопределяющий perform_* сам, вызывает в нём run_write.
+    """
+
+    def perform_create(self, serializer):
+        run_write(super().perform_create, serializer)
+
+    def perform_update(self, serializer):
+        run_write(super().perform_update, serializer)
+
+    def perform_destroy(self, instance):
+        run_write(super().perform_destroy, instance)
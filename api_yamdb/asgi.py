@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
+# чтение каталога выполняется в отдельном пуле потоков (см. api/asgi.py)
+from api.asgi import get_asgi_application  # noqa: E402
+
 application = get_asgi_application()
+
+# индекс автодополнения строится в фоне, пока сервер принимает запросы
+from api.autocomplete import build_on_startup  # noqa: E402
+
+build_on_startup()
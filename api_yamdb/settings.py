@@ -47,6 +47,7 @@ AUTH_USER_MODEL = 'api.YamDBUser'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,6 +89,29 @@ DATABASES = {
     }
 }
 
+# профиль SQLite: 'production' включает WAL и настройки соединений
+# SQLITE_PRODUCTION_PRAGMAS и держит соединения между запросами
+# (см. api/sqlite_profile.py). задаётся переменной окружения
+SQLITE_PROFILE = os.environ.get('YAMDB_SQLITE_PROFILE', 'default')
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # 256 МБ файла базы читаются через mmap
+    'mmap_size': 268435456,
+    # кэш страниц 64 МБ (отрицательное значение - в килобайтах)
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    # сколько миллисекунд ждать блокировку базы
+    'busy_timeout': 5000,
+}
+
+# время жизни соединения с базой в секундах в профиле production
+SQLITE_CONN_MAX_AGE = 600
+
+if SQLITE_PROFILE == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = SQLITE_CONN_MAX_AGE
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -136,14 +160,32 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': datetime.timedelta(days=30),
 }
 
+# число проверенных JWT токенов, которые каждый процесс держит в памяти,
+# чтобы не проверять подпись повторно (см. api/authentication.py)
+JWT_VALIDATED_TOKENS_CACHE_SIZE = 1024
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 100
+    'PAGE_SIZE': 100,
+    # ёмкость корзины и время, за которое она наполняется
+    # (см. api/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': '30/min',
+        'auth_email': '5/min',
+        'reviews': '30/min',
+        'comments': '60/min',
+    },
 }
 
+# число корзин ограничения частоты, которые каждый процесс держит в памяти
+THROTTLE_LOCAL_BUCKETS = 10000
+# алиас общего кэша для ограничения частоты на все процессы сервера,
+# None - каждый процесс ограничивает запросы сам
+THROTTLE_CACHE_ALIAS = None
+
 # это наш виртуальный почтовый ящик, от имени которого посылаются e-mail'ы
 DEFAULT_FROM_EMAIL = 'admin@yamdb.com'
 
@@ -151,5 +193,98 @@ DEFAULT_FROM_EMAIL = 'admin@yamdb.com'
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# очередь исходящих писем (см. api/outbox.py и команду deliver_emails):
+# писем за одно соединение с почтовым сервером, пауза между проверками
+# очереди, число попыток, пауза перед первой повторной попыткой
+# (дальше удваивается) и время аренды взятого в отправку письма в секундах
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_POLL_INTERVAL = 2
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_LEASE = 300
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# сервер работает в одном процессе (runserver, тесты), и версии данных
+# в кэше процесса (LocMemCache) видны всем запросам. при нескольких
+# процессах с LocMemCache кэш ответов, условные GET запросы и проверка
+# JWT токенов по версиям отключаются (см. api/cache.py)
+CACHE_SINGLE_PROCESS = False
+
+# кэш ответов на анонимные GET запросы к произведениям, жанрам и
+# категориям (api/cache.py), таймаут в секундах
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 5 * 60
+
+# время жизни кэша справочников жанров и категорий в памяти процесса
+# (api/reference.py), секунды
+REFERENCE_CACHE_TIMEOUT = 60
+
+# через сколько секунд индекс автодополнения в памяти процесса
+# перестраивается из базы, чтобы подхватить изменения других процессов
+# (api/autocomplete.py)
+AUTOCOMPLETE_INDEX_TIMEOUT = 300
+
+# строить индекс автодополнения в фоне при запуске сервера
+# (api_yamdb/wsgi.py, api_yamdb/asgi.py), а не при первом запросе
+AUTOCOMPLETE_BUILD_ON_STARTUP = True
+
+# массовое создание произведений: POST /api/v1/titles/bulk/. пачка
+# INSERT'а не больше BULK_TITLES_BATCH_SIZE строк и предела СУБД на
+# число параметров запроса
+BULK_TITLES_MAX_ITEMS = 10000
+BULK_TITLES_BATCH_SIZE = 500
+
+# топ произведений /api/v1/titles/top/: байесовский рейтинг сглаживает
+# среднюю оценку к TOP_TITLES_PRIOR_MEAN с весом TOP_TITLES_PRIOR_REVIEWS
+# отзывов. После изменения нужно выполнить manage.py rebuild_ratings
+TOP_TITLES_PRIOR_REVIEWS = 10
+TOP_TITLES_PRIOR_MEAN = 5.5
+TOP_TITLES_MAX_LIMIT = 100
+
+# потоковая выгрузка таблиц: число строк, читаемых из базы за раз
+EXPORT_CHUNK_SIZE = 2000
+
+# инструментирование запросов к API: заголовок Server-Timing и бюджеты
+# числа SQL запросов по имени маршрута (см. api/urls.py).
+# в продакшене превышение бюджета логируется, в тестах - падает
+SERVER_TIMING_PATH_PREFIX = '/api/'
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_RAISE = False
+# ключ - имя маршрута (бюджет для GET) или 'METHOD имя маршрута'
+QUERY_BUDGETS = {
+    'titles-list': 4,
+    'titles-detail': 3,
+    'titles-top': 3,
+    'reviews-list': 4,
+    'reviews-detail': 3,
+    'comments-list': 4,
+    'comments-detail': 3,
+    'categories-list': 3,
+    'genres-list': 3,
+    'POST reviews-list': 4,
+    'PATCH reviews-detail': 5,
+    'DELETE reviews-detail': 7,
+    'POST comments-list': 3,
+    'PATCH comments-detail': 4,
+}
+
+# запись из write endpoint'ов через единственный поток-писатель на процесс
+# с объединением записей в одну транзакцию (см. api/writer.py):
+# включение, блокировка файла базы между процессами, максимум записей
+# в транзакции и сколько миллисекунд ждать следующие записи
+SERIALIZED_WRITES = False
+SERIALIZED_WRITES_PROCESS_LOCK = True
+WRITE_BATCH_SIZE = 32
+WRITE_BATCH_WAIT = 2
+
+# число потоков, в которых ASGI сервер выполняет чтение каталога
+# (см. api/asgi.py)
+ASYNC_READ_WORKERS = 8
+
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^/api/.*$'
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
 application = get_wsgi_application()
+
+# индекс автодополнения строится в фоне, пока сервер принимает запросы
+from api.autocomplete import build_on_startup  # noqa: E402
+
+build_on_startup()
@@ -1,4 +1,6 @@
 pytest_plugins = [
     'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_settings',
+    'tests.fixtures.fixture_state',
     # 'tests.fixtures.fixture_data',
 ]
@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def query_budget_raise(settings):
+    settings.QUERY_BUDGET_RAISE = True
+
+
+@pytest.fixture(autouse=True)
+def cache_single_process(settings):
+    # тесты работают в одном процессе, версии в LocMemCache корректны
+    settings.CACHE_SINGLE_PROCESS = True
@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    # индексы и кэши в памяти процесса переживают очистку базы между
+    # тестами, поэтому сбрасываем их перед каждым тестом
+    from django.core.cache import cache
+
+    from api.authentication import validated_tokens
+    from api.autocomplete import prefix_index
+    from api.reference import categories_cache, genres_cache
+    from api.throttling import local_buckets
+    prefix_index.clear()
+    genres_cache.invalidate()
+    categories_cache.invalidate()
+    validated_tokens.clear()
+    local_buckets.clear()
+    cache.clear()
@@ -0,0 +1,114 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Review, Title
+
+from .common import create_reviews
+
+
+class Test07RatingAggregates:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_aggregates_follow_reviews(self, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (12, 3), \
+            'Проверьте, что при создании отзыва обновляются агрегаты оценок `Title`'
+        assert title.rating == 4, \
+            'Проверьте, что при создании отзыва пересчитывается `rating`'
+
+        user_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/',
+            data={'score': 8}
+        )
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (15, 3), \
+            'Проверьте, что при изменении оценки отзыва агрегаты обновляются на разницу'
+
+        user_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (7, 2), \
+            'Проверьте, что при удалении отзыва агрегаты уменьшаются'
+
+        user.delete()
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (4, 1), \
+            'Проверьте, что при каскадном удалении отзывов агрегаты уменьшаются'
+        assert title.rating == 4
+
+        moderator.delete()
+        title.refresh_from_db()
+        assert title.score_count == 0 and title.rating is None, \
+            'Проверьте, что без отзывов `rating` равен `None`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_command(self, user_client, admin):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        call_command('rebuild_ratings', '--check')
+
+        Title.objects.filter(pk=titles[0]['id']).update(score_sum=0, score_count=0, rating=None)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+
+        call_command('rebuild_ratings')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count, title.rating) == (12, 3, 4), \
+            'Проверьте, что команда `rebuild_ratings` восстанавливает агрегаты'
+        call_command('rebuild_ratings', '--check')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_deferred_score(self, user_client, admin):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        with CaptureQueriesContext(connection) as context:
+            reviews = list(Review.objects.only('id', 'text'))
+        assert len(reviews) == 3
+        assert len(context.captured_queries) == 1, \
+            'Проверьте, что загрузка отзывов с отложенной оценкой не загружает её отдельно'
+
+        review = reviews[0]
+        review.text = 'новый текст'
+        review.save()
+        review.delete()
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (7, 2), \
+            'Проверьте, что агрегаты верны для отзывов с отложенной оценкой'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_cascade_grouped_per_title(self, user_client, admin):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        with CaptureQueriesContext(connection) as context:
+            Review.objects.filter(title=title).exclude(author=admin).delete()
+        updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE "api_title"')]
+        assert len(updates) == 1, \
+            'Проверьте, что при удалении нескольких отзывов агрегаты обновляются одним UPDATE на произведение'
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count, title.score_3_count) == (5, 1, 0)
+
+        with CaptureQueriesContext(connection) as context:
+            title.delete()
+        updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE "api_title"')]
+        assert len(updates) <= 1, \
+            'Проверьте, что каскадное удаление не обновляет агрегаты на каждый отзыв'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_rolled_back_delete(self, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+
+        def fail(sender, instance, **kwargs):
+            raise RuntimeError
+
+        models.signals.pre_delete.connect(fail, sender=Title)
+        try:
+            with pytest.raises(RuntimeError):
+                Title.objects.get(pk=titles[0]['id']).delete()
+        finally:
+            models.signals.pre_delete.disconnect(fail, sender=Title)
+
+        Review.objects.filter(pk__in=[reviews[0]['id'], reviews[1]['id']]).delete()
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (4, 1), \
+            'Проверьте, что откаченное удаление не влияет на агрегаты следующего'
+        call_command('rebuild_ratings', '--check')
@@ -0,0 +1,66 @@
+from base64 import b64decode
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.utils import timezone
+
+from api.models import Review
+from api.pagination import PublicationPagination
+
+from .common import create_reviews, create_titles
+
+
+class Test08CursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_cursor(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        response = client.get('/api/v1/titles/?cursor=')
+        assert response.status_code == 200, \
+            'Проверьте, что при GET запросе `/api/v1/titles/?cursor=` возвращается статус 200'
+        data = response.json()
+        assert 'count' not in data, \
+            'Проверьте, что в режиме курсора не возвращается `count`'
+        assert 'next' in data and 'previous' in data, \
+            'Проверьте, что в режиме курсора возвращаются ссылки `next` и `previous`'
+        assert [item['id'] for item in data['results']] == sorted(
+            (title['id'] for title in titles), reverse=True), \
+            'Проверьте, что в режиме курсора произведения упорядочены по `id`'
+
+        response = client.get('/api/v1/titles/')
+        assert response.json().get('count') == len(titles), \
+            'Проверьте, что без параметра `cursor` используется постраничная пагинация'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_cursor_walk(self, client, user_client, admin, monkeypatch):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        monkeypatch.setattr(PublicationPagination, 'page_size', 2)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor='
+        seen = []
+        pages = 0
+        while url:
+            data = client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+            pages += 1
+        assert pages == 2
+        assert sorted(seen) == sorted(review['id'] for review in reviews), \
+            'Проверьте, что обход отзывов по курсору возвращает все отзывы ровно один раз'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_equal_pub_dates(self, client, user_client, admin, monkeypatch):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        Review.objects.update(pub_date=timezone.now())
+        monkeypatch.setattr(PublicationPagination, 'page_size', 1)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor='
+        seen = []
+        while url:
+            data = client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+            if url:
+                cursor = parse_qs(urlparse(url).query)['cursor'][0]
+                position = parse_qs(b64decode(cursor).decode())
+                assert 'o' not in position, \
+                    'Проверьте, что курсор отзывов не использует OFFSET при одинаковых `pub_date`'
+        assert seen == sorted((review['id'] for review in reviews), reverse=True)
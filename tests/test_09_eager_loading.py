@@ -0,0 +1,41 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments, create_titles
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+class Test09EagerLoading:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_constant_queries(self, client, user_client):
+        create_titles(user_client)
+        before = count_queries(client, '/api/v1/titles/')
+        user_client.post('/api/v1/titles/', data={
+            'name': 'Ещё', 'year': 2001, 'genre': ['horror', 'drama'], 'category': 'books'})
+        user_client.post('/api/v1/titles/', data={
+            'name': 'И ещё', 'year': 2002, 'genre': ['comedy'], 'category': 'films'})
+        assert count_queries(client, '/api/v1/titles/') == before, \
+            'Проверьте, что число запросов к базе для списка `/api/v1/titles/` не зависит от числа произведений'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_and_comments_constant_queries(self, client, user_client, admin):
+        comments, reviews, titles, _, _ = create_comments(user_client, admin)
+        title_id = titles[0]['id']
+        review_id = reviews[0]['id']
+        reviews_queries = count_queries(client, f'/api/v1/titles/{title_id}/reviews/')
+        comments_queries = count_queries(
+            client, f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/')
+        # в списках по несколько объектов от разных авторов, поэтому без
+        # select_related число запросов было бы больше
+        assert reviews_queries <= 3, \
+            'Проверьте, что авторы отзывов загружаются одним запросом со списком'
+        assert comments_queries <= 3, \
+            'Проверьте, что авторы комментариев загружаются одним запросом со списком'
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from api.middleware import QueryBudgetExceeded
+from api.views import TitleViewSet
+
+from .common import create_titles
+
+
+class Test10ServerTiming:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_server_timing_header(self, client, user_client):
+        create_titles(user_client)
+        response = client.get('/api/v1/titles/')
+        header = response.get('Server-Timing', '')
+        assert 'db;dur=' in header and 'queries' in header, \
+            'Проверьте, что ответ API содержит время и число запросов к базе в `Server-Timing`'
+        assert 'serialize;dur=' in header and 'render;dur=' in header, \
+            'Проверьте, что ответ API содержит время сериализации и рендеринга в `Server-Timing`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_query_budget(self, client, settings):
+        settings.QUERY_BUDGETS = {'titles-list': 0}
+        with pytest.raises(QueryBudgetExceeded):
+            client.get('/api/v1/titles/')
+
+        settings.QUERY_BUDGET_RAISE = False
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 200, \
+            'Проверьте, что вне тестов превышение бюджета запросов только логируется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_serialize_excludes_view_code(self, client, user_client, monkeypatch):
+        create_titles(user_client)
+        original = TitleViewSet.check_permissions
+
+        def slow_check_permissions(self, request):
+            time.sleep(0.05)
+            return original(self, request)
+
+        monkeypatch.setattr(TitleViewSet, 'check_permissions', slow_check_permissions)
+        header = client.get('/api/v1/titles/').get('Server-Timing', '')
+        metrics = dict(
+            (item.split(';')[0].strip(), float(item.split('dur=')[1].split(';')[0]))
+            for item in header.split(',')
+        )
+        assert 0 < metrics['serialize'] < 50 <= metrics['total'], \
+            'Проверьте, что `serialize` замеряет сериализацию, а не весь код view'
@@ -0,0 +1,36 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test11FullTextSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        response = client.get('/api/v1/titles/?q=пово')
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [titles[0]['id']], \
+            'Проверьте, что `?q=` ищет по префиксу слова без учёта регистра'
+
+        response = client.get('/api/v1/titles/?q=драма')
+        assert [item['id'] for item in response.json()['results']] == [titles[1]['id']], \
+            'Проверьте, что `?q=` ищет по описанию произведения'
+
+        response = client.get('/api/v1/titles/?q=*"')
+        assert response.json()['results'] == [], \
+            'Проверьте, что `?q=` без слов не находит произведений'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_index_follows_changes(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        user_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Переворот'})
+        response = client.get('/api/v1/titles/?q=переворот')
+        assert [item['id'] for item in response.json()['results']] == [titles[1]['id']], \
+            'Проверьте, что поисковый индекс обновляется при изменении произведения'
+
+        user_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        response = client.get('/api/v1/titles/?q=переворот')
+        assert response.json()['results'] == [], \
+            'Проверьте, что поисковый индекс обновляется при удалении произведения'
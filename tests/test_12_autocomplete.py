@@ -0,0 +1,95 @@
+import time
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.autocomplete import PrefixIndex, prefix_index
+from api.models import Genre, Title
+
+from .common import create_titles
+
+
+class Test12Autocomplete:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_autocomplete(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        response = client.get('/api/v1/autocomplete/?q=пОв')
+        assert response.status_code == 200, \
+            'Проверьте, что GET запрос `/api/v1/autocomplete/` возвращает статус 200'
+        assert response.json() == [{'type': 'titles', 'id': titles[0]['id'], 'name': titles[0]['name']}], \
+            'Проверьте, что автодополнение ищет по началу названия без учёта регистра'
+
+        response = client.get('/api/v1/autocomplete/?q=туд')
+        assert [item['name'] for item in response.json()] == [titles[0]['name']], \
+            'Проверьте, что автодополнение ищет по началу любого слова в названии'
+
+        response = client.get('/api/v1/autocomplete/?q=к&type=genres&type=categories')
+        assert sorted(item['slug'] for item in response.json()) == ['books', 'comedy'], \
+            'Проверьте, что автодополнение фильтрует подсказки по параметру `type`'
+
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/autocomplete/?q=про')
+        assert len(context.captured_queries) == 0, \
+            'Проверьте, что автодополнение не обращается к базе данных'
+
+        response = client.get('/api/v1/autocomplete/')
+        assert response.status_code == 400, \
+            'Проверьте, что без параметра `q` возвращается статус 400'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_index_follows_changes(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        client.get('/api/v1/autocomplete/?q=про')
+        user_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Переворот'})
+        assert client.get('/api/v1/autocomplete/?q=про').json() == [], \
+            'Проверьте, что индекс автодополнения обновляется при изменении названия'
+        assert len(client.get('/api/v1/autocomplete/?q=перев').json()) == 1
+
+        user_client.delete('/api/v1/genres/drama/')
+        assert client.get('/api/v1/autocomplete/?q=драм').json() == [], \
+            'Проверьте, что индекс автодополнения обновляется при удалении жанра'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rollback_and_reload(self, client, user_client, settings):
+        create_titles(user_client)
+        client.get('/api/v1/autocomplete/?q=про')
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Genre.objects.create(name='Фантом', slug='phantom')
+                raise RuntimeError
+        assert client.get('/api/v1/autocomplete/?q=фант').json() == [], \
+            'Проверьте, что откаченная запись не попадает в индекс автодополнения'
+
+        # запись из другого процесса: сигналы этого процесса её не видят
+        Genre.objects.bulk_create([Genre(name='Вестерн', slug='western')])
+        assert client.get('/api/v1/autocomplete/?q=вест').json() == []
+        settings.AUTOCOMPLETE_INDEX_TIMEOUT = 0
+        assert client.get('/api/v1/autocomplete/?q=вест').json() == [], \
+            'Проверьте, что устаревший индекс перестраивается в фоне, а запрос не ждёт загрузки'
+        prefix_index.join()
+        settings.AUTOCOMPLETE_INDEX_TIMEOUT = 300
+        assert client.get('/api/v1/autocomplete/?q=вест').json() == [
+            {'type': 'genres', 'slug': 'western', 'name': 'Вестерн'}], \
+            'Проверьте, что индекс автодополнения перестраивается по таймауту'
+
+    def test_04_bulk_merge_and_kinds(self):
+        index = PrefixIndex()
+        index._loaded_at = time.monotonic()
+        index.update('genres', Genre(id=1, name='Альтернатива', slug='alt'))
+        titles = [Title(id=pk, name=f'Альбом {pk:05}') for pk in range(1, 501)]
+        index.update_many('titles', titles)
+        assert index.search('ал', kinds={'genres'}) == [
+            {'type': 'genres', 'slug': 'alt', 'name': 'Альтернатива'}], \
+            'Проверьте, что фильтр `type` ищет только по нужному виду'
+        assert [item['name'] for item in index.search('ал', limit=3)] == [
+            'Альбом 00001', 'Альбом 00002', 'Альбом 00003'], \
+            'Проверьте, что подсказки разных видов упорядочены по названию'
+
+        index.update_many('titles', [Title(id=1, name='Поворот')])
+        index.remove('titles', titles[1])
+        assert [item['name'] for item in index.search('ал', limit=2)] == [
+            'Альбом 00003', 'Альбом 00004']
+        assert index.search('пов') == [{'type': 'titles', 'id': 1, 'name': 'Поворот'}]
@@ -0,0 +1,66 @@
+import pytest
+
+from api.cache import get_stats
+
+from .common import auth_client, create_titles, create_users_api
+
+
+class Test13ResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_anonymous_list_cached(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        response = client.get('/api/v1/titles/?year=2000&name=Пов')
+        assert response['X-Cache'] == 'MISS'
+        response = client.get('/api/v1/titles/?name=Пов&year=2000')
+        assert response['X-Cache'] == 'HIT', \
+            'Проверьте, что анонимный ответ кэшируется независимо от порядка параметров'
+        assert response.json()['results'][0]['id'] == titles[0]['id']
+        assert get_stats() == {'hits': 1, 'misses': 1}, \
+            'Проверьте, что считаются попадания и промахи кэша'
+
+        response = user_client.get('/api/v1/titles/?year=2000&name=Пов')
+        assert 'X-Cache' not in response, \
+            'Проверьте, что ответы авторизованным пользователям не кэшируются'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_invalidation(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        other_url = f'/api/v1/titles/{titles[1]["id"]}/'
+        client.get(url)
+        client.get(other_url)
+
+        user, _ = create_users_api(user_client)
+        auth_client(user).post(f'{url}reviews/', data={'text': 'текст', 'score': 6})
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and response.json()['rating'] == 6, \
+            'Проверьте, что отзыв сбрасывает кэш произведения'
+        assert client.get(other_url)['X-Cache'] == 'HIT', \
+            'Проверьте, что отзыв не сбрасывает кэш других произведений'
+
+        user_client.patch(url, data={'genre': ['drama']})
+        assert [genre['slug'] for genre in client.get(url).json()['genre']] == ['drama'], \
+            'Проверьте, что изменение жанров произведения сбрасывает кэш'
+
+        client.get('/api/v1/genres/')
+        user_client.post('/api/v1/genres/', data={'name': 'Триллер', 'slug': 'thriller'})
+        response = client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS' and response.json()['count'] == 4, \
+            'Проверьте, что создание жанра сбрасывает кэш списка жанров'
+
+        user_client.delete('/api/v1/categories/films/')
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and response.json()['category'] is None, \
+            'Проверьте, что удаление категории сбрасывает кэш произведений'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_process_local_cache(self, client, user_client, settings):
+        settings.CACHE_SINGLE_PROCESS = False
+        create_titles(user_client)
+        client.get('/api/v1/titles/')
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert 'X-Cache' not in response, \
+            'Проверьте, что без общего кэша версий ответы не кэшируются'
+        assert get_stats() == {'hits': 0, 'misses': 0}
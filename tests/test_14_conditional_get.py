@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_reviews
+
+
+class Test14ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_etag(self, client, user_client, admin):
+        reviews, titles, user, _ = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        etag = response.get('ETag')
+        assert etag and response.get('Last-Modified'), \
+            'Проверьте, что ответ содержит заголовки `ETag` и `Last-Modified`'
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, \
+            'Проверьте, что при совпадении `If-None-Match` возвращается статус 304'
+        assert len(context.captured_queries) == 0, \
+            'Проверьте, что ответ 304 отдаётся без запросов к базе данных'
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304, \
+            'Проверьте, что при `If-Modified-Since` не раньше изменения возвращается статус 304'
+
+        user_client.patch(f'{url}reviews/{reviews[0]["id"]}/', data={'score': 10})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response['ETag'] != etag, \
+            'Проверьте, что изменение отзыва меняет `ETag` произведения'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_and_comments_etag(self, client, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        reviews_etag = client.get(reviews_url)['ETag']
+        comments_etag = client.get(comments_url)['ETag']
+
+        user_client.post(comments_url, data={'text': 'комментарий'})
+        assert client.get(comments_url, HTTP_IF_NONE_MATCH=comments_etag).status_code == 200, \
+            'Проверьте, что новый комментарий меняет `ETag` списка комментариев'
+        assert client.get(reviews_url, HTTP_IF_NONE_MATCH=reviews_etag).status_code == 304, \
+            'Проверьте, что комментарий не меняет `ETag` списка отзывов'
+
+        response = user_client.delete(f'{reviews_url}{reviews[0]["id"]}/')
+        assert response.status_code == 204
+        assert client.get(reviews_url, HTTP_IF_NONE_MATCH=reviews_etag).status_code == 200, \
+            'Проверьте, что удаление отзыва меняет `ETag` списка отзывов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_if_none_match_star(self, client, user_client, admin):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 304
+        response = client.get('/api/v1/titles/999/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 404, \
+            'Проверьте, что `If-None-Match: *` для несуществующего объекта возвращает 404'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_process_local_cache(self, client, user_client, admin, settings):
+        settings.CACHE_SINGLE_PROCESS = False
+        _, titles, _, _ = create_reviews(user_client, admin)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.status_code == 200
+        assert 'ETag' not in response and 'Last-Modified' not in response, \
+            'Проверьте, что без общего кэша версий `ETag` не выставляется'
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 200
@@ -0,0 +1,64 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import bump_versions
+from api.models import Category
+
+from .common import create_titles
+
+
+class Test15ReferenceCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_reference_queries(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/?genre=drama&category=books')
+        assert [item['id'] for item in response.json()['results']] == [titles[1]['id']], \
+            'Проверьте, что фильтрация по `genre` и `category` работает'
+        assert response.json()['results'][0]['category'] == {'name': 'Книги', 'slug': 'books'}
+        assert not any(
+            'FROM "api_category"' in query['sql'] or '"api_genre"."slug" =' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что slug в фильтрах переводится в id по кэшу справочника'
+
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post('/api/v1/titles/', data={
+                'name': 'Новое', 'year': 2010, 'genre': ['comedy'], 'category': 'films'})
+        assert response.status_code == 201
+        sql = [query['sql'] for query in context.captured_queries]
+        validation = sql[:next(i for i, query in enumerate(sql) if query.startswith('INSERT INTO "api_title"'))]
+        assert not any(
+            'FROM "api_genre"' in query or 'FROM "api_category"' in query
+            for query in validation
+        ), 'Проверьте, что slug жанров и категорий проверяются по кэшу справочника'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cache_invalidation(self, client, user_client):
+        create_titles(user_client)
+        data = {'name': 'Новое', 'year': 2010, 'genre': ['thriller'], 'category': 'films'}
+        assert user_client.post('/api/v1/titles/', data=data).status_code == 400, \
+            'Проверьте, что нельзя указать несуществующий жанр'
+        user_client.post('/api/v1/genres/', data={'name': 'Триллер', 'slug': 'thriller'})
+        assert user_client.post('/api/v1/titles/', data=data).status_code == 201, \
+            'Проверьте, что новый жанр сразу доступен после создания'
+        user_client.delete('/api/v1/genres/thriller/')
+        assert client.get('/api/v1/titles/?genre=thriller').json()['count'] == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_changed_in_other_process(self, client, user_client):
+        titles, _, _ = create_titles(user_client)
+        url = f'/api/v1/titles/{titles[1]["id"]}/'
+        assert client.get('/api/v1/titles/?category=books').json()['count'] == 1
+
+        # изменение в другом процессе: сигналы этого процесса не срабатывают,
+        # меняются только версии в общем кэше
+        Category.objects.filter(slug='books').update(name='Романы', slug='novels')
+        bump_versions('categories', 'titles')
+        assert client.get('/api/v1/titles/?category=books').json()['count'] == 0, \
+            'Проверьте, что справочник перезагружается при смене версии в общем кэше'
+        assert client.get('/api/v1/titles/?category=novels').json()['count'] == 1
+        assert client.get(url).json()['category'] == {'name': 'Романы', 'slug': 'novels'}, \
+            'Проверьте, что в произведении выводится актуальная категория'
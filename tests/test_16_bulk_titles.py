@@ -0,0 +1,101 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Title
+
+from .common import create_categories, create_genre
+
+
+class Test16BulkTitles:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_create(self, client, user_client):
+        create_genre(user_client)
+        create_categories(user_client)
+        data = [
+            {'name': f'Произведение {i}', 'year': 2000 + i % 20,
+             'genre': ['horror', 'drama'] if i % 2 else ['comedy'], 'category': 'films'}
+            for i in range(30)
+        ]
+        response = client.post('/api/v1/titles/bulk/', data=data, content_type='application/json')
+        assert response.status_code == 401, \
+            'Проверьте, что массовое создание недоступно без авторизации'
+
+        response = user_client.post('/api/v1/titles/bulk/', data=data, format='json')
+        assert response.status_code == 201, \
+            'Проверьте, что POST запрос `/api/v1/titles/bulk/` возвращает статус 201'
+        ids = response.json()['ids']
+        assert response.json()['count'] == len(data) == len(ids)
+        titles = {title.id: title for title in Title.objects.prefetch_related('genre')}
+        for item, title_id in zip(data, ids):
+            title = titles[title_id]
+            assert title.name == item['name'], \
+                'Проверьте, что id в ответе соответствуют порядку элементов запроса'
+            assert sorted(genre.slug for genre in title.genre.all()) == sorted(item['genre']), \
+                'Проверьте, что при массовом создании сохраняются жанры'
+
+        response = client.get('/api/v1/titles/?q=произведение')
+        assert response.json()['count'] == len(data), \
+            'Проверьте, что созданные произведения попадают в поисковый индекс'
+        assert len(client.get('/api/v1/autocomplete/?q=произв&limit=50').json()) == len(data)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_validation(self, user_client):
+        create_genre(user_client)
+        create_categories(user_client)
+        data = [
+            {'name': 'Хорошее', 'year': 2000, 'genre': ['horror'], 'category': 'films'},
+            {'name': 'Плохое', 'year': 2000, 'genre': ['unknown'], 'category': 'films'},
+        ]
+        response = user_client.post('/api/v1/titles/bulk/', data=data, format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что при ошибке в любом элементе возвращается статус 400'
+        assert Title.objects.count() == 0, \
+            'Проверьте, что при ошибке валидации ничего не создаётся'
+
+        response = user_client.post('/api/v1/titles/bulk/', data={'name': 'x'}, format='json')
+        assert response.status_code == 400
+
+        response = user_client.post('/api/v1/titles/bulk/', data=[], format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что пустой список произведений возвращает статус 400'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_without_returning_ids(self, user_client, monkeypatch):
+        create_genre(user_client)
+        create_categories(user_client)
+        # СУБД без RETURNING из bulk_create и без блокировки всей базы
+        monkeypatch.setattr(connection, 'vendor', 'mysql')
+        data = [
+            {'name': f'Произведение {i}', 'year': 2000, 'genre': ['horror'], 'category': 'films'}
+            for i in range(3)
+        ]
+        response = user_client.post('/api/v1/titles/bulk/', data=data, format='json')
+        assert response.status_code == 201
+        ids = response.json()['ids']
+        assert sorted(ids) == sorted(Title.objects.values_list('id', flat=True))
+        for title_id in ids:
+            assert list(Title.objects.get(pk=title_id).genre.values_list('slug', flat=True)) == ['horror']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_batches_fit_query_params(self, user_client):
+        create_genre(user_client)
+        create_categories(user_client)
+        data = [
+            {'name': f'Произведение {i}', 'year': 2000, 'genre': ['horror', 'drama'], 'category': 'films'}
+            for i in range(200)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post('/api/v1/titles/bulk/', data=data, format='json')
+        assert response.status_code == 201
+        limit = connection.features.max_query_params
+        for table, model in (('api_title', Title), ('api_title_genre', Title.genre.through)):
+            inserts = [
+                query['sql'] for query in context.captured_queries
+                if query['sql'].startswith(f'INSERT INTO "{table}"')
+            ]
+            # SQLite вставляет пачку как SELECT ... UNION ALL SELECT ...
+            columns = len(model._meta.concrete_fields) - 1
+            assert inserts and all((sql.count(' UNION ALL ') + 1) * columns <= limit for sql in inserts), \
+                'Проверьте, что пачка bulk_create не превышает предел СУБД на число параметров'
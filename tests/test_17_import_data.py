@@ -0,0 +1,87 @@
+import csv
+import os
+import shutil
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from api.models import Comment, ImportedRow, Review, Title
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+
+
+def csv_rows(name):
+    with open(os.path.join(DATA_DIR, f'{name}.csv'), encoding='utf8') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+def write_rows(path, rows):
+    with open(path, 'w', encoding='utf8', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class Test17ImportData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_import(self, client):
+        call_command('import_data', '--data', DATA_DIR, '--chunk-size', '10')
+        assert Title.objects.count() == len(csv_rows('titles'))
+        assert Review.objects.count() == len(csv_rows('review'))
+        assert Comment.objects.count() == len(csv_rows('comments'))
+
+        review = csv_rows('review')[0]
+        assert Review.objects.get(pk=review['id']).pub_date.isoformat().startswith(review['pub_date'][:19]), \
+            'Проверьте, что при загрузке сохраняется `pub_date` из csv'
+
+        call_command('rebuild_ratings', '--check')
+        title = csv_rows('titles')[0]
+        response = client.get(f'/api/v1/titles/?q={title["name"].split()[0]}')
+        assert title['name'] in [item['name'] for item in response.json()['results']], \
+            'Проверьте, что загруженные произведения попадают в поисковый индекс'
+
+        call_command('import_data', '--data', DATA_DIR)
+        assert Title.objects.count() == len(csv_rows('titles')), \
+            'Проверьте, что повторная загрузка пропускает существующие строки'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_parallel_import(self):
+        call_command('import_data', '--data', DATA_DIR, '--workers', '2', '--chunk-size', '7')
+        assert Title.objects.count() == len(csv_rows('titles'))
+        assert Review.objects.count() == len(csv_rows('review')), \
+            'Проверьте, что параллельная загрузка записывает все строки'
+        assert Title.genre.through.objects.count() == len(csv_rows('genre_title'))
+        call_command('rebuild_ratings', '--check')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_incremental_import(self, client, tmp_path):
+        data_dir = tmp_path / 'data'
+        shutil.copytree(DATA_DIR, data_dir)
+        call_command('import_data', '--data', str(data_dir), '--incremental')
+        assert Review.objects.count() == len(csv_rows('review'))
+        assert ImportedRow.objects.filter(table='api.Review').count() == len(csv_rows('review')), \
+            'Проверьте, что инкрементальная загрузка сохраняет хэши строк'
+
+        titles = csv_rows('titles')
+        titles[0]['name'] = 'Обновлённое название'
+        write_rows(data_dir / 'titles.csv', titles)
+        reviews = csv_rows('review')
+        reviews[0]['score'] = '1' if reviews[0]['score'] != '1' else '2'
+        write_rows(data_dir / 'review.csv', reviews)
+        comments = csv_rows('comments')
+        write_rows(data_dir / 'comments.csv', comments[1:])
+
+        call_command('import_data', '--data', str(data_dir), '--incremental')
+        assert Title.objects.get(pk=titles[0]['id']).name == 'Обновлённое название', \
+            'Проверьте, что инкрементальная загрузка обновляет изменённые строки'
+        assert Review.objects.get(pk=reviews[0]['id']).score == int(reviews[0]['score'])
+        assert not Comment.objects.filter(pk=comments[0]['id']).exists(), \
+            'Проверьте, что строки, пропавшие из csv, удаляются'
+        assert Comment.objects.count() == len(comments) - 1
+        call_command('rebuild_ratings', '--check')
+
+        response = client.get('/api/v1/titles/?q=Обновлённое')
+        assert [item['id'] for item in response.json()['results']] == [int(titles[0]['id'])], \
+            'Проверьте, что изменённые произведения переиндексируются'
@@ -0,0 +1,74 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+import pytest
+from django.core.management import call_command
+
+from api.models import Review, Title
+
+from .test_17_import_data import DATA_DIR
+
+
+def read_csv(data):
+    return list(csv.DictReader(io.StringIO(data.decode())))
+
+
+class Test18ExportData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_export_command_round_trip(self, tmp_path):
+        call_command('import_data', '--data', DATA_DIR)
+        export_dir = tmp_path / 'export'
+        call_command('export_data', '--output', str(export_dir), '--chunk-size', '10')
+        with open(export_dir / 'review.csv', 'rb') as export_file:
+            rows = read_csv(export_file.read())
+        assert len(rows) == Review.objects.count()
+        with open(os.path.join(DATA_DIR, 'review.csv'), encoding='utf8') as data_file:
+            assert list(rows[0]) == next(csv.reader(data_file)), \
+                'Проверьте, что колонки выгрузки совпадают с data/*.csv'
+
+        call_command('export_data', 'titles', '--output', str(export_dir), '--format', 'ndjson', '--gzip')
+        with gzip.open(export_dir / 'titles.ndjson.gz', 'rt', encoding='utf8') as export_file:
+            titles = [json.loads(line) for line in export_file]
+        assert len(titles) == Title.objects.count()
+        assert titles[0]['rating'] == Title.objects.get(pk=titles[0]['id']).rating, \
+            'Проверьте, что в выгрузку попадает рейтинг произведения'
+        assert list(titles[0]) == ['id', 'name', 'year', 'category_id', 'description', 'rating'], \
+            'Проверьте, что служебные агрегаты оценок не попадают в выгрузку'
+
+        Review.objects.all().delete()
+        Title.objects.all().delete()
+        call_command('import_data', '--data', str(export_dir))
+        assert Review.objects.count() == len(rows), \
+            'Проверьте, что выгрузку в csv можно загрузить обратно'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export_endpoint(self, client, user_client):
+        call_command('import_data', '--data', DATA_DIR)
+        response = client.get('/api/v1/export/titles/')
+        assert response.status_code == 401, \
+            'Проверьте, что выгрузка недоступна без авторизации'
+        response = user_client.get('/api/v1/export/unknown/')
+        assert response.status_code == 404
+
+        response = user_client.get('/api/v1/export/titles/')
+        assert response.status_code == 200
+        assert response.streaming, 'Проверьте, что выгрузка отдаётся потоком'
+        assert response['Content-Type'].startswith('text/csv')
+        rows = read_csv(b''.join(response.streaming_content))
+        assert len(rows) == Title.objects.count()
+
+        response = user_client.get('/api/v1/export/review/?output=ndjson&gzip=true')
+        assert response.status_code == 200
+        assert response['Content-Disposition'] == 'attachment; filename="review.ndjson.gz"'
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        assert len(lines) == Review.objects.count()
+        first = json.loads(lines[0])
+        assert first['author'] == Review.objects.get(pk=first['id']).author_id, \
+            'Проверьте, что колонки NDJSON совпадают с data/*.csv'
+
+        response = user_client.get('/api/v1/export/review/?output=xml')
+        assert response.status_code == 400
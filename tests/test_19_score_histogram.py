@@ -0,0 +1,55 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.models import Title
+
+from .common import create_reviews
+
+
+def histogram(*scores):
+    result = [0] * 10
+    for score in scores:
+        result[score - 1] += 1
+    return result
+
+
+class Test19ScoreHistogram:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_histogram_follows_reviews(self, client, user_client, admin):
+        reviews, titles, user, _ = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        distribution = client.get(url).json()['score_distribution']
+        assert distribution['histogram'] == histogram(5, 3, 4), \
+            'Проверьте, что гистограмма оценок отдаётся в `score_distribution`'
+        assert distribution['median'] == 4
+        assert distribution['percentiles'] == {'25': 3.5, '50': 4, '75': 4.5, '90': 4.8}, \
+            'Проверьте, что перцентили интерполируются между соседними оценками'
+        assert 'score_distribution' not in client.get('/api/v1/titles/').json()['results'][0]
+
+        user_client.patch(f'{url}reviews/{reviews[0]["id"]}/', data={'score': 8})
+        assert client.get(url).json()['score_distribution']['histogram'] == histogram(8, 3, 4), \
+            'Проверьте, что при изменении оценки гистограмма обновляется'
+
+        user_client.delete(f'{url}reviews/{reviews[0]["id"]}/')
+        distribution = client.get(url).json()['score_distribution']
+        assert distribution['histogram'] == histogram(3, 4), \
+            'Проверьте, что при удалении отзыва гистограмма уменьшается'
+        assert distribution['median'] == 3.5
+
+        user.delete()
+        assert Title.objects.get(pk=titles[0]['id']).score_histogram == histogram(4), \
+            'Проверьте, что гистограмма учитывает каскадное удаление отзывов'
+        assert client.get(f'/api/v1/titles/{titles[1]["id"]}/').json()['score_distribution']['median'] is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_histogram(self, user_client, admin):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        Title.objects.filter(pk=titles[0]['id']).update(score_3_count=0, score_10_count=7)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+
+        call_command('rebuild_ratings')
+        assert Title.objects.get(pk=titles[0]['id']).score_histogram == histogram(5, 3, 4), \
+            'Проверьте, что команда `rebuild_ratings` восстанавливает гистограмму'
+        call_command('rebuild_ratings', '--check')
@@ -0,0 +1,79 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.models import Category, Genre, Review, Title
+
+
+def create_title_with_reviews(django_user_model, name, category, genre, scores):
+    title = Title.objects.create(name=name, year=2000, category=category)
+    title.genre.add(genre)
+    for number, score in enumerate(scores):
+        author = django_user_model.objects.create(
+            username=f'{name}-{number}', email=f'{name}-{number}@yamdb.fake')
+        Review.objects.create(title=title, author=author, text='текст', score=score)
+    return title
+
+
+class Test20TopTitles:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_top(self, client, django_user_model):
+        films = Category.objects.create(name='Фильмы', slug='films')
+        books = Category.objects.create(name='Книги', slug='books')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        popular = create_title_with_reviews(django_user_model, 'popular', films, drama, [8] * 20)
+        single = create_title_with_reviews(django_user_model, 'single', films, comedy, [10])
+        book = create_title_with_reviews(django_user_model, 'book', books, drama, [6, 7])
+        Title.objects.create(name='empty', year=2000, category=films)
+
+        response = client.get('/api/v1/titles/top/')
+        assert response.status_code == 200, \
+            'Проверьте, что GET запрос `/api/v1/titles/top/` возвращает статус 200'
+        data = response.json()
+        assert [item['id'] for item in data] == [popular.id, single.id, book.id], \
+            'Проверьте, что топ строится по байесовскому рейтингу и без произведений без отзывов'
+        assert data[0]['reviews_count'] == 20
+        assert data[0]['weighted_rating'] == pytest.approx((160 + 10 * 5.5) / 30)
+
+        response = client.get('/api/v1/titles/top/?by=reviews&limit=2')
+        assert [item['id'] for item in response.json()] == [popular.id, book.id], \
+            'Проверьте, что `by=reviews` сортирует по числу отзывов, а `limit` ограничивает топ'
+
+        response = client.get('/api/v1/titles/top/?category=books')
+        assert [item['id'] for item in response.json()] == [book.id], \
+            'Проверьте, что топ фильтруется по категории'
+        response = client.get('/api/v1/titles/top/?genre=comedy')
+        assert [item['id'] for item in response.json()] == [single.id], \
+            'Проверьте, что топ фильтруется по жанру'
+
+        assert client.get('/api/v1/titles/top/?by=votes').status_code == 400
+        assert client.get('/api/v1/titles/top/?limit=1000').status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_top_follows_reviews(self, client, django_user_model):
+        films = Category.objects.create(name='Фильмы', slug='films')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        first = create_title_with_reviews(django_user_model, 'first', films, drama, [9, 9])
+        second = create_title_with_reviews(django_user_model, 'second', films, drama, [8, 8])
+
+        response = client.get('/api/v1/titles/top/')
+        assert [item['id'] for item in response.json()] == [first.id, second.id]
+        assert client.get('/api/v1/titles/top/')['X-Cache'] == 'HIT'
+
+        for review in Review.objects.filter(title=first):
+            review.score = 1
+            review.save()
+        response = client.get('/api/v1/titles/top/')
+        assert [item['id'] for item in response.json()] == [second.id, first.id], \
+            'Проверьте, что топ обновляется при изменении отзывов'
+
+        Review.objects.filter(title=second).delete()
+        assert [item['id'] for item in client.get('/api/v1/titles/top/').json()] == [first.id]
+
+        call_command('rebuild_ratings', '--check')
+        Title.objects.filter(pk=first.id).update(weighted_rating=None)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
@@ -0,0 +1,58 @@
+import pytest
+from django.db import connection
+
+from api.models import Category, Review, Title
+
+
+def ids(response):
+    return [item['id'] for item in response.json()['results']]
+
+
+class Test21TitleOrdering:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_ordering(self, client, admin, django_user_model):
+        category = Category.objects.create(name='Фильмы', slug='films')
+        other = django_user_model.objects.create(username='other', email='other@yamdb.fake')
+        first = Title.objects.create(name='Б', year=2001, category=category)
+        second = Title.objects.create(name='А', year=1999, category=category)
+        third = Title.objects.create(name='В', year=2001)
+        Review.objects.create(title=first, author=admin, text='текст', score=3)
+        Review.objects.create(title=second, author=admin, text='текст', score=9)
+        Review.objects.create(title=second, author=other, text='текст', score=7)
+
+        assert ids(client.get('/api/v1/titles/?ordering=-rating'))[:2] == [second.id, first.id], \
+            'Проверьте, что `?ordering=-rating` сортирует по рейтингу'
+        assert ids(client.get('/api/v1/titles/?ordering=name')) == [second.id, first.id, third.id], \
+            'Проверьте, что `?ordering=name` сортирует по названию'
+        assert ids(client.get('/api/v1/titles/?ordering=-year')) == [third.id, first.id, second.id], \
+            'Проверьте, что при равных значениях порядок однозначен (по id)'
+        assert ids(client.get('/api/v1/titles/?ordering=year,-name')) == [second.id, third.id, first.id]
+        assert ids(client.get('/api/v1/titles/?ordering=-reviews_count')) == [second.id, first.id, third.id], \
+            'Проверьте, что `?ordering=reviews_count` сортирует по числу отзывов'
+        assert ids(client.get('/api/v1/titles/?ordering=-year&category=films')) == [first.id, second.id]
+        assert ids(client.get('/api/v1/titles/?ordering=password')) == \
+            ids(client.get('/api/v1/titles/')), \
+            'Проверьте, что неизвестные поля сортировки игнорируются'
+
+        response = client.get('/api/v1/titles/?ordering=name&cursor=')
+        assert response.status_code == 200
+        assert ids(response) == [third.id, second.id, first.id], \
+            'Проверьте, что режим курсора сохраняет сортировку по id'
+
+    @pytest.mark.django_db
+    def test_02_ordering_uses_indexes(self):
+        queries = (
+            Title.objects.order_by('-rating', '-id'),
+            Title.objects.filter(category_id=1).order_by('-year', '-id'),
+            Title.objects.filter(year=2000).order_by('-rating', '-id'),
+            Title.objects.order_by('name', 'id'),
+            Title.objects.order_by('-score_count', '-id'),
+        )
+        for queryset in queries:
+            sql, params = queryset[:10].query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            assert 'TEMP B-TREE' not in plan, \
+                f'Проверьте, что для сортировки есть индекс: {plan}'
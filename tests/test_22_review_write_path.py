@@ -0,0 +1,62 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Review, Title
+
+from .common import create_reviews, create_titles
+
+
+class Test22ReviewWritePath:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_create_queries(self, user_client):
+        titles, _, _ = create_titles(user_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data={'text': 'текст', 'score': 7})
+        assert response.status_code == 201
+        statements = [query['sql'].split()[0] for query in context.captured_queries]
+        assert statements.count('SELECT') == 1, \
+            'Проверьте, что при создании отзыва нет SELECT кроме загрузки пользователя'
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (7, 1)
+
+        response = user_client.post(url, data={'text': 'ещё раз', 'score': 1})
+        assert response.status_code == 400, \
+            'Проверьте, что повторный отзыв на произведение возвращает статус 400'
+        assert response.json() == {'non_field_errors': ['Отзыв уже существует']}
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (7, 1), \
+            'Проверьте, что при отклонённом отзыве агрегаты оценок не меняются'
+
+        response = user_client.post('/api/v1/titles/999/reviews/', data={'text': 'текст', 'score': 7})
+        assert response.status_code == 404
+        assert not Review.objects.filter(title_id=999).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_unique_constraint(self, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        with pytest.raises(IntegrityError):
+            Review.objects.create(title_id=titles[0]['id'], author=admin, text='текст', score=1)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (12, 3), \
+            'Проверьте, что агрегаты обновляются в одной транзакции с записью отзыва'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_update_and_delete_queries(self, user_client, admin):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.patch(url, data={'score': 2})
+        assert response.status_code == 200
+        assert response.json()['author'] == admin.username
+        assert len(context.captured_queries) <= 5, \
+            'Проверьте, что изменение отзыва не загружает произведение и автора отдельными запросами'
+
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.delete(url)
+        assert response.status_code == 204
+        assert len(context.captured_queries) <= 6
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (7, 2)
@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments
+
+
+def review_queries(context):
+    # запросы, которые читают только таблицу отзывов (загрузка родителя)
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT') and 'FROM "api_review"' in query['sql'] and
+        'api_comment' not in query['sql']
+    ]
+
+
+class Test23NestedParent:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_list_without_parent_lookup(self, client, user_client, admin):
+        comments, reviews, titles, _, _ = create_comments(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()['count'] == len(comments)
+        assert not review_queries(context), \
+            'Проверьте, что непустой список комментариев не загружает отзыв отдельным запросом'
+
+        response = client.get(f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/comments/')
+        assert response.status_code == 404, \
+            'Проверьте, что отзыв другого произведения возвращает статус 404'
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/comments/')
+        assert response.status_code == 200 and response.json()['count'] == 0, \
+            'Проверьте, что для отзыва без комментариев возвращается пустой список'
+        assert client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/999/comments/').status_code == 404
+
+        response = client.get(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/comments/{comments[0]["id"]}/')
+        assert response.status_code == 404, \
+            'Проверьте, что комментарий ищется с проверкой всей цепочки родителей'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_create_resolves_parent_once(self, user_client, admin):
+        _, reviews, titles, _, _ = create_comments(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data={'text': 'текст'})
+        assert response.status_code == 201
+        assert len(review_queries(context)) == 1, \
+            'Проверьте, что при создании комментария отзыв загружается одним запросом'
+
+        response = user_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/comments/', data={'text': 'текст'})
+        assert response.status_code == 404, \
+            'Проверьте, что нельзя прокомментировать отзыв через чужое произведение'
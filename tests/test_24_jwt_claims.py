@@ -0,0 +1,99 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import token_for_user, validated_tokens
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_for_user(user)}')
+    return client
+
+
+def user_queries(context):
+    return [query['sql'] for query in context.captured_queries if 'FROM "api_yamdbuser"' in query['sql']]
+
+
+class Test24JWTClaims:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_user_query(self, admin):
+        client = token_client(admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/genres/', data={'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201, \
+            'Проверьте, что права администратора берутся из токена'
+        assert not user_queries(context), \
+            'Проверьте, что пользователь с актуальным токеном не загружается из базы'
+
+        response = client.get('/api/v1/users/me/')
+        assert response.json()['email'] == admin.email
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/genres/', data={'name': 'Комедия', 'slug': 'comedy'})
+        assert response.status_code == 201
+        assert not user_queries(context)
+        assert len(validated_tokens._tokens) == 1, \
+            'Проверьте, что проверенный токен хранится в LRU'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_changed_user_falls_back_to_db(self, django_user_model):
+        user = django_user_model.objects.create_user(
+            username='moderator', email='moderator@yamdb.fake', role='admin')
+        client = token_client(user)
+        assert client.get('/api/v1/users/').status_code == 200
+
+        user.role = 'user'
+        user.save()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/users/')
+        assert response.status_code == 403, \
+            'Проверьте, что после изменения пользователя роль берётся из базы, а не из токена'
+        assert user_queries(context)
+
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401, \
+            'Проверьте, что токен неактивного пользователя не принимается'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_token_without_claims(self, user_client):
+        response = user_client.post('/api/v1/genres/', data={'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201, \
+            'Проверьте, что токены без полей пользователя по-прежнему принимаются'
+
+    def test_04_lru_size(self, settings):
+        from api.authentication import ValidatedTokenCache
+        tokens = ValidatedTokenCache(2)
+        for raw in (b'a', b'b', b'c'):
+            tokens.set(raw, {'exp': 2 ** 40})
+        assert tokens.get(b'a') is None and tokens.get(b'c') is not None
+        tokens.set(b'd', {'exp': 0})
+        assert tokens.get(b'd') is None, 'Проверьте, что истёкшие токены не отдаются из LRU'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_process_local_versions(self, admin, settings):
+        settings.CACHE_SINGLE_PROCESS = False
+        client = token_client(admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/genres/', data={'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201
+        assert user_queries(context), \
+            'Проверьте, что при кэше процесса (LocMemCache) пользователь загружается из базы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_cache_unavailable(self, admin, monkeypatch):
+        client = token_client(admin)
+
+        def unavailable(names):
+            raise ConnectionError('кэш недоступен')
+
+        monkeypatch.setattr('api.authentication.get_versions', unavailable)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/genres/', data={'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201, \
+            'Проверьте, что при недоступном кэше версий запрос не падает'
+        assert user_queries(context), \
+            'Проверьте, что при недоступном кэше версий пользователь загружается из базы'
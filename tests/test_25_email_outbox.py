@@ -0,0 +1,85 @@
+from smtplib import SMTPException
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import OutgoingEmail
+from api.outbox import deliver_batch
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise SMTPException('почтовый сервер недоступен')
+
+
+class Test25EmailOutbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_mail_is_queued(self, django_user_model):
+        response = APIClient().post('/api/v1/auth/mail/', data={'email': 'new@yamdb.fake'})
+        assert response.status_code == 200
+        assert not mail.outbox, \
+            'Проверьте, что `/api/v1/auth/mail/` не отправляет письмо во время запроса'
+        email = OutgoingEmail.objects.get()
+        assert email.recipient == 'new@yamdb.fake' and email.sent_at is None, \
+            'Проверьте, что письмо ставится в очередь исходящих писем'
+        assert not django_user_model.objects.get(email='new@yamdb.fake').is_active
+
+        call_command('deliver_emails', '--once')
+        assert len(mail.outbox) == 1, \
+            'Проверьте, что команда `deliver_emails` отправляет письма из очереди'
+        assert mail.outbox[0].to == ['new@yamdb.fake']
+        assert 'Ваш код активации' in mail.outbox[0].body
+        email.refresh_from_db()
+        assert email.sent_at is not None
+
+        call_command('deliver_emails', '--once')
+        assert len(mail.outbox) == 1, 'Проверьте, что письмо отправляется один раз'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_batches(self, settings):
+        client = APIClient()
+        for i in range(5):
+            client.post('/api/v1/auth/mail/', data={'email': f'user{i}@yamdb.fake'})
+        assert deliver_batch(batch_size=2) == (2, 0)
+        assert len(mail.outbox) == 2
+        assert OutgoingEmail.objects.filter(sent_at__isnull=True).count() == 3
+        assert deliver_batch(batch_size=10) == (3, 0)
+        assert deliver_batch(batch_size=10) == (0, 0)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_retry_with_backoff(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_25_email_outbox.FailingBackend'
+        settings.EMAIL_OUTBOX_RETRY_DELAY = 60
+        APIClient().post('/api/v1/auth/mail/', data={'email': 'retry@yamdb.fake'})
+
+        assert deliver_batch() == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1 and email.sent_at is None
+        assert 'почтовый сервер недоступен' in email.last_error
+        assert email.next_attempt_at > timezone.now(), \
+            'Проверьте, что повторная отправка откладывается'
+        assert deliver_batch() == (0, 0), \
+            'Проверьте, что письмо не отправляется повторно до истечения паузы'
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert deliver_batch() == (1, 0)
+        assert len(mail.outbox) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_max_attempts(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_25_email_outbox.FailingBackend'
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        APIClient().post('/api/v1/auth/mail/', data={'email': 'dead@yamdb.fake'})
+        for _ in range(2):
+            assert deliver_batch() == (0, 1)
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert deliver_batch() == (0, 0), \
+            'Проверьте, что письмо не отправляется после EMAIL_OUTBOX_MAX_ATTEMPTS попыток'
+        assert OutgoingEmail.objects.get().attempts == 2
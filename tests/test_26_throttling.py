@@ -0,0 +1,101 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import token_for_user
+from api.models import OutgoingEmail
+from api.throttling import local_buckets
+
+from .common import create_titles
+
+
+def set_rates(settings, **rates):
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = dict(
+        rest_framework['DEFAULT_THROTTLE_RATES'], **rates)
+    settings.REST_FRAMEWORK = rest_framework
+
+
+class Test26Throttling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_auth_email(self, settings):
+        set_rates(settings, auth_email='3/min')
+        client = APIClient()
+        for _ in range(3):
+            response = client.post('/api/v1/auth/mail/', data={'email': 'burst@yamdb.fake'})
+            assert response.status_code == 200
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/auth/mail/', data={'email': 'Burst@yamdb.fake'})
+        assert response.status_code == 429, \
+            'Проверьте, что частые запросы к `/api/v1/auth/mail/` для одного e-mail ограничиваются'
+        assert 0 < int(response['Retry-After']) <= 20, \
+            'Проверьте, что ответ 429 содержит заголовок `Retry-After`'
+        assert not context.captured_queries, \
+            'Проверьте, что ограничение срабатывает до обращения к базе'
+        assert OutgoingEmail.objects.count() == 3
+
+        response = client.post('/api/v1/auth/mail/', data={'email': 'other@yamdb.fake'})
+        assert response.status_code == 200, \
+            'Проверьте, что ограничение по e-mail не затрагивает другие адреса'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_auth_ip(self, settings):
+        set_rates(settings, auth_ip='2/min')
+        client = APIClient()
+        assert client.post('/api/v1/auth/mail/', data={'email': 'a@yamdb.fake'}).status_code == 200
+        assert client.post('/api/v1/auth/token/', data={'email': 'a@yamdb.fake'}).status_code != 429
+        response = client.post('/api/v1/auth/mail/', data={'email': 'b@yamdb.fake'})
+        assert response.status_code == 429, \
+            'Проверьте, что запросы к auth ограничиваются по IP адресу'
+
+        other = APIClient(REMOTE_ADDR='10.0.0.2')
+        assert other.post('/api/v1/auth/mail/', data={'email': 'b@yamdb.fake'}).status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_review_writes(self, settings, admin, user_client):
+        set_rates(settings, reviews='2/min')
+        titles, _, _ = create_titles(user_client)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_for_user(admin)}')
+        for title in titles[:2]:
+            response = client.post(f'/api/v1/titles/{title["id"]}/reviews/', data={'text': 'текст', 'score': 5})
+            assert response.status_code == 201
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, data={'text': 'текст', 'score': 5})
+        assert response.status_code == 429, \
+            'Проверьте, что создание отзывов одним пользователем ограничивается'
+        assert 'Retry-After' in response
+        assert not context.captured_queries, \
+            'Проверьте, что ограничение срабатывает до обращения к базе'
+        assert client.get(url).status_code == 200, \
+            'Проверьте, что чтение отзывов не ограничивается'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_refill(self, settings, monkeypatch):
+        set_rates(settings, auth_email='1/min')
+        now = [1000.0]
+        monkeypatch.setattr('api.throttling.time.monotonic', lambda: now[0])
+        client = APIClient()
+        assert client.post('/api/v1/auth/mail/', data={'email': 'r@yamdb.fake'}).status_code == 200
+        assert client.post('/api/v1/auth/mail/', data={'email': 'r@yamdb.fake'}).status_code == 429
+        now[0] += 60
+        assert client.post('/api/v1/auth/mail/', data={'email': 'r@yamdb.fake'}).status_code == 200, \
+            'Проверьте, что корзина наполняется со временем'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_shared_cache(self, settings):
+        settings.THROTTLE_CACHE_ALIAS = 'default'
+        set_rates(settings, auth_email='2/min')
+        client = APIClient()
+        for _ in range(2):
+            assert client.post('/api/v1/auth/mail/', data={'email': 's@yamdb.fake'}).status_code == 200
+        # другой процесс сервера: своих корзин в памяти у него нет
+        local_buckets.clear()
+        response = client.post('/api/v1/auth/mail/', data={'email': 's@yamdb.fake'})
+        assert response.status_code == 429, \
+            'Проверьте, что при THROTTLE_CACHE_ALIAS ограничение действует на все процессы'
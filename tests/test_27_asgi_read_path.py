@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+from django.core import signals
+from django.core.handlers.wsgi import WSGIHandler
+
+from api.asgi import CatalogASGIHandler, is_catalog_read
+from api.benchmark import asgi_scope, run_asgi, run_wsgi
+
+from .common import create_titles
+
+
+class ThreadRecorder:
+
+    def __init__(self):
+        self.threads = []
+
+    def __call__(self, sender, **kwargs):
+        self.threads.append(threading.current_thread().name)
+
+
+class Test27ASGIReadPath:
+
+    def test_01_catalog_routes(self):
+        assert is_catalog_read(asgi_scope('/api/v1/titles/'))
+        assert is_catalog_read(asgi_scope('/api/v1/titles/1/reviews/2/comments/'))
+        assert is_catalog_read(asgi_scope('/api/v1/genres/'))
+        assert not is_catalog_read(asgi_scope('/api/v1/titles/', method='POST'))
+        assert not is_catalog_read(asgi_scope('/api/v1/users/'))
+        assert not is_catalog_read(asgi_scope('/api/v1/export/titles/'))
+        assert not is_catalog_read(asgi_scope('/nowhere/'))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_read_pool(self, user_client):
+        titles, _, _ = create_titles(user_client)
+        recorder = ThreadRecorder()
+        signals.request_started.connect(recorder)
+        try:
+            result = run_asgi(
+                'asgi', CatalogASGIHandler(),
+                lambda number, index: f'/api/v1/titles/{titles[0]["id"]}/',
+                clients=3, requests=2, client_delay=0)
+            run_asgi('asgi', CatalogASGIHandler(), lambda number, index: '/api/v1/users/',
+                     clients=1, requests=1, client_delay=0)
+        finally:
+            signals.request_started.disconnect(recorder)
+        assert result.statuses == {200: 6}
+        assert all(name.startswith('catalog-read') for name in recorder.threads[:6]), \
+            'Проверьте, что чтение каталога выполняется в пуле потоков `catalog-read`'
+        assert not recorder.threads[-1].startswith('catalog-read'), \
+            'Проверьте, что остальные запросы обрабатываются стандартным обработчиком'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_same_response(self, user_client):
+        create_titles(user_client)
+        bodies = {}
+
+        class Collect(CatalogASGIHandler):
+            async def send_response(self, response, send):
+                bodies['asgi'] = response.content
+                await super().send_response(response, send)
+
+        run_asgi('asgi', Collect(), lambda number, index: '/api/v1/titles/',
+                 clients=1, requests=1, client_delay=0)
+        result = run_wsgi('wsgi', WSGIHandler(), lambda number, index: '/api/v1/titles/',
+                          clients=2, requests=1, client_delay=0, threads=2)
+        assert result.statuses == {200: 2}
+        assert bodies['asgi'] == user_client.get('/api/v1/titles/').content
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+
+def open_connection(path):
+    wrapper = DatabaseWrapper(dict(connection.settings_dict, NAME=str(path)), alias='profile')
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+class Test28SQLiteProfile:
+
+    @pytest.mark.django_db
+    def test_01_production_pragmas(self, settings, tmp_path):
+        settings.SQLITE_PROFILE = 'production'
+        wrapper = open_connection(tmp_path / 'db.sqlite3')
+        try:
+            assert pragma(wrapper, 'journal_mode') == 'wal', \
+                'Проверьте, что в профиле production включается журнал WAL'
+            assert pragma(wrapper, 'synchronous') == 1
+            assert pragma(wrapper, 'busy_timeout') == 5000
+            assert pragma(wrapper, 'temp_store') == 2
+            assert pragma(wrapper, 'cache_size') == -64000
+            assert pragma(wrapper, 'mmap_size') == 268435456
+        finally:
+            wrapper.close()
+
+    @pytest.mark.django_db
+    def test_02_default_profile(self, settings, tmp_path):
+        settings.SQLITE_PROFILE = 'default'
+        wrapper = open_connection(tmp_path / 'db.sqlite3')
+        try:
+            assert pragma(wrapper, 'journal_mode') == 'delete', \
+                'Проверьте, что без профиля production настройки SQLite не меняются'
+            assert pragma(wrapper, 'synchronous') == 2
+        finally:
+            wrapper.close()
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+from django.db import models, transaction
+from rest_framework.test import APIClient
+
+from api.models import Comment, Genre, OutgoingEmail, Review, Title
+from api.writer import get_writer, run_write, stop_writers
+
+from .common import create_comments, create_reviews
+
+
+@pytest.fixture
+def serialized_writes(settings):
+    settings.SERIALIZED_WRITES = True
+    yield
+    stop_writers()
+
+
+class SaveThreads:
+
+    def __init__(self):
+        self.threads = []
+
+    def __call__(self, sender, **kwargs):
+        self.threads.append((sender, threading.current_thread().name))
+
+
+class Test29SingleWriter:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_endpoints_use_writer(self, serialized_writes, user_client, admin):
+        recorder = SaveThreads()
+        models.signals.post_save.connect(recorder)
+        try:
+            reviews, titles, _, _ = create_reviews(user_client, admin)
+            create_comments(user_client, admin)
+            response = APIClient().post('/api/v1/auth/mail/', data={'email': 'writer@yamdb.fake'})
+            assert response.status_code == 200
+        finally:
+            models.signals.post_save.disconnect(recorder)
+
+        for model in (Title, Review, Comment, OutgoingEmail):
+            threads = {name for sender, name in recorder.threads if sender is model}
+            assert threads == {'writer-default'}, \
+                f'Проверьте, что {model.__name__} записывается через поток-писатель'
+        assert Title.objects.get(pk=titles[0]['id']).score_count == 3
+
+        response = user_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'ещё', 'score': 1})
+        assert response.status_code == 400, \
+            'Проверьте, что ошибки записи возвращаются из потока-писателя'
+        response = user_client.post('/api/v1/titles/999/reviews/', data={'text': 'текст', 'score': 1})
+        assert response.status_code == 404
+
+        review_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        assert user_client.patch(review_url, data={'score': 9}).status_code == 200
+        assert user_client.delete(review_url).status_code == 204
+        assert Title.objects.get(pk=titles[0]['id']).score_count == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_group_commit(self, serialized_writes):
+        commits = [0]
+        seen = []
+        started, release = threading.Event(), threading.Event()
+
+        def committed():
+            commits[0] += 1
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        def write(number):
+            seen.append(commits[0])
+            transaction.on_commit(committed)
+            if number == 3:
+                raise ValueError('ошибка записи')
+            return Genre.objects.create(name=f'Жанр {number}', slug=f'genre-{number}').slug
+
+        writer = get_writer()
+        first = writer.submit(blocking)
+        assert started.wait(5)
+        futures = [writer.submit(write, number) for number in range(10)]
+        release.set()
+        first.result(5)
+
+        for number, future in enumerate(futures):
+            if number == 3:
+                with pytest.raises(ValueError):
+                    future.result(5)
+            else:
+                assert future.result(5) == f'genre-{number}'
+        assert len(set(seen)) == 1, \
+            'Проверьте, что накопившиеся записи выполняются в одной транзакции'
+        assert Genre.objects.count() == 9, \
+            'Проверьте, что ошибка одной записи не откатывает остальные записи пачки'
+        assert commits[0] == 9
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_disabled(self, settings):
+        settings.SERIALIZED_WRITES = False
+        assert run_write(threading.current_thread) is threading.current_thread(), \
+            'Проверьте, что без SERIALIZED_WRITES запись выполняется в текущем потоке'
@@ -0,0 +1,52 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = [('api', '0016_title_ordering_indexes')]
+AFTER = [('api', '0017_review_unique_author_title')]
+
+
+def migrate(targets):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    return executor.loader.project_state(targets).apps
+
+
+class Test30ReviewDedupe:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_migration_stops_on_duplicates(self):
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes('api')
+        apps = migrate(BEFORE)
+        try:
+            User = apps.get_model('api', 'YamDBUser')
+            Category = apps.get_model('api', 'Category')
+            Title = apps.get_model('api', 'Title')
+            Review = apps.get_model('api', 'Review')
+            Comment = apps.get_model('api', 'Comment')
+            author = User.objects.create(username='author', email='author@yamdb.fake')
+            title = Title.objects.create(
+                name='Произведение', year=2000,
+                category=Category.objects.create(name='Книги', slug='books'))
+            first = Review.objects.create(title=title, author=author, text='первый', score=5)
+            second = Review.objects.create(title=title, author=author, text='второй', score=7)
+            Comment.objects.create(review=second, author=author, text='комментарий')
+            # исторические модели не обновляют агрегаты оценок
+            call_command('rebuild_ratings', verbosity=0)
+
+            with pytest.raises(CommandError, match=f'author={author.id}, title={title.id}'):
+                migrate(AFTER)
+            assert Review.objects.count() == 2, \
+                'Проверьте, что миграция не удаляет отзывы сама'
+
+            call_command('dedupe_reviews')
+            assert Review.objects.count() == 2, \
+                'Проверьте, что без --delete команда только показывает повторы'
+            call_command('dedupe_reviews', '--delete')
+            assert list(Review.objects.values_list('id', flat=True)) == [first.id]
+            assert Comment.objects.count() == 0
+        finally:
+            migrate(latest)
+        call_command('rebuild_ratings', '--check')